@@ -0,0 +1,610 @@
+#!/usr/bin/env python3
+
+# Documentation style according to https://realpython.com/documenting-python-code/, NumPy/SciPy docstrings format
+
+"""Benchmarks for the Multi Cluster / Multi Application Render Tool
+
+This script measures how the render tool (hacks/render.py) scales with the size of an instance. It
+generates synthetic instances in a temporary directory and times the individual processing steps.
+
+The suite command generates a complete repository (instance, nested groups, projects, applications
+and value files following the DirectoryLayout, plus a stub helm binary) and times config loading,
+group resolution, application resolution, value file resolution and an end-to-end render. Results
+can be saved per git commit and compared.
+
+Examples:
+    hacks/benchmark.py config --clusters 1000,2000,5000
+    hacks/benchmark.py yaml --instance int --instance prod
+    hacks/benchmark.py suite --clusters 500 --save
+    hacks/benchmark.py compare 1a2b3c4 HEAD
+"""
+
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from copy import deepcopy
+
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import render  # noqa: E402
+
+
+def legacy_deep_merge(a: dict, b: dict) -> dict:
+    """The deep merge used by Instance.config before the single-pass merge, kept as reference."""
+    result = deepcopy(a)
+    for bk, bv in b.items():
+        av = result.get("k")
+        if isinstance(av, dict) and isinstance(bv, dict):
+            result[bk] = legacy_deep_merge(av, bv)
+        else:
+            result[bk] = deepcopy(bv)
+    return result
+
+
+# stub helm for the benchmarks and the tests, renders the files of the chart and of the shared charts
+# (relative to the application chart projects/<project>/applications/<app>) as they are, so any change
+# of a file shows up
+STUB_HELM = """#!/bin/sh
+[ "$1" = "--debug" ] && shift
+case "$1" in
+    version) echo "v0.0.0+stub"; exit 0;;
+    dependency)
+        mkdir -p "$3/charts" "$3/tmpcharts"
+        touch "$3/Chart.lock" "$3/charts/dependency-0.1.0.tgz"
+        rmdir "$3/tmpcharts"
+        exit 0;;
+esac
+shared="$3/../../../../shared/charts"
+[ -d "$shared" ] || shared=
+find "$3" $shared -type f | sort | xargs cat
+"""
+
+
+def generate_repository(
+    root: str,
+    name: str = "bench",
+    clusters: int = 200,
+    groups: int = 10,
+    depth: int = 3,
+    apps_per_group: int = 3,
+    projects: int = 3,
+    files: int = 0,
+) -> render.Instance:
+    """
+    Generates a synthetic repository below the given root directory, following the default
+    DirectoryLayout, and returns its instance. A stub helm binary is written to <root>/bin/helm.
+
+    The groups form depth tiers of the given number of groups ("tier<d>/group-<i>"); every group
+    nests one group of the next tier and assigns apps_per_group applications. Each cluster is
+    assigned one group of each tier. The applications are spread over the projects and come with
+    application, group and cluster value files.
+
+    Parameters
+    ----------
+    root : str
+        the root directory of the generated repository
+    name : str, optional
+        the name of the instance
+    clusters : int, optional
+        the number of clusters in the instance
+    groups : int, optional
+        the number of groups per tier
+    depth : int, optional
+        the number of group tiers, i.e. the nesting depth of the groups
+    apps_per_group : int, optional
+        the number of applications assigned by each group
+    projects : int, optional
+        the number of projects
+    files : int, optional
+        the number of additional config files in the instance directory
+    """
+    layout = render.DirectoryLayout(root)
+    _, dumper = render.yaml_backend()
+
+    def _write(path: str, data) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            if isinstance(data, str):
+                f.write(data)
+            else:
+                yaml.dump(data, f, Dumper=dumper)
+
+    group_apps = {}
+    applications = []
+    for tier in range(depth):
+        for i in range(groups):
+            group = f"tier{tier}/group-{i}"
+            apps = [
+                {
+                    "name": f"app-{tier}-{i}-{k}",
+                    "namespace": f"app-{tier}-{i}-{k}",
+                    "project": f"project-{k % projects}",
+                }
+                for k in range(apps_per_group)
+            ]
+            group_apps[group] = {"applications": apps, "excludes": []}
+            if tier + 1 < depth:
+                group_apps[group]["groups"] = [
+                    f"tier{tier + 1}/group-{(i + 1) % groups}"
+                ]
+            applications.extend((group, app) for app in apps)
+
+    cluster_configs = [
+        {
+            "name": f"cluster-{c:05d}",
+            "api": f"api.cluster-{c:05d}.example.com:6443",
+            "groups": [
+                f"tier{tier}/group-{(c + tier) % groups}" for tier in range(depth)
+            ],
+            "applications": [],
+        }
+        for c in range(clusters)
+    ]
+
+    instance_path = layout.instance(name)
+    _write(
+        os.path.join(instance_path, "Chart.yaml"),
+        {"apiVersion": "v2", "name": name, "version": "0.1.0"},
+    )
+    _write(os.path.join(instance_path, "clusters.yaml"), {"clusters": cluster_configs})
+    _write(
+        os.path.join(instance_path, "cluster-group-applications.yaml"),
+        {"clusterGroupApps": group_apps},
+    )
+    _write(
+        os.path.join(instance_path, "projects.yaml"),
+        {"projects": {f"project-{p}": {} for p in range(projects)}},
+    )
+    for i in range(files):
+        _write(
+            os.path.join(instance_path, f"values-{i:03d}.yaml"),
+            {f"setting{i}": {"enabled": True, "items": list(range(10))}},
+        )
+
+    for group, app in applications:
+        project, appname = app["project"], app["name"]
+        chart = layout.app(project, appname)
+        _write(
+            os.path.join(chart, "Chart.yaml"),
+            {"apiVersion": "v2", "name": appname, "version": "0.1.0"},
+        )
+        _write(os.path.join(chart, "values.yaml"), {"replicas": 1})
+        _write(
+            os.path.join(chart, "templates", "configmap.yaml"),
+            "apiVersion: v1\nkind: ConfigMap\n",
+        )
+        _write(
+            layout.group_values_file(project, group, f"{appname}.yaml"),
+            {"group": group},
+        )
+    for group in group_apps:
+        for p in range(projects):
+            _write(
+                layout.group_values_file(f"project-{p}", group, "common.yaml"),
+                {"group": group},
+            )
+    for cluster in cluster_configs:
+        for p in range(projects):
+            _write(
+                layout.cluster_values_file(
+                    f"project-{p}", cluster["name"], "common.yaml"
+                ),
+                {"cluster": cluster["name"]},
+            )
+
+    helm = os.path.join(root, "bin", "helm")
+    _write(helm, STUB_HELM)
+    os.chmod(helm, 0o755)
+
+    return render.Instance(name, layout)
+
+
+def best_of(func, repeat: int = 3, setup=None) -> float:
+    """
+    Returns the fastest wall time in seconds of repeat calls of func.
+
+    Parameters
+    ----------
+    func : callable
+        the function to time; called with the return value of setup if setup is provided
+    repeat : int, optional
+        the number of calls
+    setup : callable, optional
+        function called before each call of func, its runtime is not measured
+    """
+    timings = []
+    for _ in range(repeat):
+        args = (setup(),) if setup else ()
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def bench_config(clusters: list, files: int, repeat: int) -> None:
+    """
+    Measures the config load time and compares the single-pass merge with the legacy deep merge.
+
+    Parameters
+    ----------
+    clusters : list
+        the cluster counts of the generated instances
+    files : int
+        the number of additional config files per instance
+    repeat : int
+        the number of runs per measurement, the fastest one is reported
+    """
+    print(
+        f"{'clusters':>10} {'load [s]':>10} {'merge [s]':>10} {'legacy merge [s]':>17}"
+    )
+    for count in clusters:
+        with tempfile.TemporaryDirectory() as root:
+            instance = generate_repository(root, clusters=count, files=files)
+
+            def _load() -> None:
+                with contextlib.suppress(AttributeError):
+                    del instance._config
+                instance.config
+
+            documents = []
+            for file in sorted(os.listdir(instance.path)):
+                with open(os.path.join(instance.path, file), "r") as f:
+                    documents.append(yaml.safe_load(f))
+
+            def _merge(docs: list) -> None:
+                result = {"clusters": {}, "clusterGroupApps": {}}
+                for doc in docs:
+                    render.deep_merge_into(result, doc)
+
+            def _legacy_merge(docs: list) -> None:
+                result = {"clusters": {}, "clusterGroupApps": {}}
+                for doc in docs:
+                    result = legacy_deep_merge(result, doc)
+
+            load = best_of(_load, repeat)
+            # the single-pass merge adopts the parsed documents, so each run needs its own copy
+            merge = best_of(_merge, repeat, lambda: deepcopy(documents))
+            legacy_merge = best_of(_legacy_merge, repeat, lambda: documents)
+            print(f"{count:>10} {load:>10.3f} {merge:>10.3f} {legacy_merge:>17.3f}")
+
+
+def bench_yaml(root: str, instances: list, repeat: int) -> None:
+    """
+    Compares the parse time of the available yaml backends on the configuration files of real instances.
+
+    Parameters
+    ----------
+    root : str
+        the root directory of the repository
+    instances : list
+        the names of the instances whose configuration files are parsed; all instances if empty
+    repeat : int
+        the number of runs per measurement, the fastest one is reported
+    """
+    layout = render.DirectoryLayout(root)
+    if not instances:
+        instances = layout.instance_names()
+
+    backends = list(render.YAML_BACKENDS)
+    print(
+        f"{'instance':<20} {'size [KiB]':>10}"
+        + "".join(f" {b + ' [s]':>14}" for b in backends)
+    )
+    for name in instances:
+        files = render.Instance(name, layout).config_files()
+        contents = []
+        for file in files:
+            with open(file, "r") as f:
+                contents.append(f.read())
+
+        timings = []
+        for backend in backends:
+            loader, _ = render.yaml_backend(backend)
+
+            def _parse() -> None:
+                for content in contents:
+                    yaml.load(content, Loader=loader)
+
+            timings.append(best_of(_parse, repeat))
+
+        size = sum(len(content) for content in contents) / 1024
+        print(f"{name:<20} {size:>10.1f}" + "".join(f" {t:>14.4f}" for t in timings))
+
+
+def bench_suite(root: str, parameters: dict, repeat: int, jobs: int) -> dict:
+    """
+    Runs the benchmark suite on a generated repository and returns the fastest wall time in seconds
+    of each benchmark.
+
+    Parameters
+    ----------
+    root : str
+        the directory in which the repository is generated
+    parameters : dict
+        the keyword arguments of generate_repository()
+    repeat : int
+        the number of runs per measurement, the fastest one is reported
+    jobs : int
+        the number of parallel helm calls of the end-to-end render
+    """
+    instance = generate_repository(root, **parameters)
+    name, layout = instance.name, instance.layout
+    helm = os.path.join(root, "bin", "helm")
+
+    def _instance(stage: str = None) -> render.Instance:
+        # every run starts with a fresh instance (and filesystem index), the steps before the
+        # benchmarked stage are done in the setup and are not measured
+        instance = render.Instance(name, layout.with_root(root))
+        if stage in ("groups", "applications", "value_paths"):
+            instance.config
+            # build the filesystem index, the scan is part of neither of these stages
+            instance.layout.isdir(instance.layout.projects)
+        if stage in ("applications", "value_paths"):
+            for cluster in instance.clusters.values():
+                cluster.groups
+        if stage == "value_paths":
+            for cluster in instance.clusters.values():
+                cluster.applications
+        return instance
+
+    def _groups(instance: render.Instance) -> None:
+        for cluster in instance.clusters.values():
+            cluster.groups
+
+    def _applications(instance: render.Instance) -> None:
+        for cluster in instance.clusters.values():
+            cluster.applications
+
+    def _value_paths(instance: render.Instance) -> None:
+        for cluster in instance.clusters.values():
+            for appname in cluster.applications:
+                cluster.app_values_file_paths(appname)
+
+    def _render(instance: render.Instance) -> None:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stderr(devnull):
+            render.render(instance, helm_bin=helm, cleanup=False, quiet=True, jobs=jobs)
+
+    return {
+        "config": best_of(lambda instance: instance.config, repeat, _instance),
+        "groups": best_of(_groups, repeat, lambda: _instance("groups")),
+        "applications": best_of(
+            _applications, repeat, lambda: _instance("applications")
+        ),
+        "value_paths": best_of(_value_paths, repeat, lambda: _instance("value_paths")),
+        "render": best_of(_render, repeat, _instance),
+    }
+
+
+def git_commit() -> str:
+    """Returns the current git commit of the repository containing this script, with a "-dirty"
+    suffix if the working tree has uncommitted changes."""
+    directory = os.path.dirname(os.path.abspath(__file__))
+    commit = (
+        subprocess.run(
+            ["git", "-C", directory, "rev-parse", "--short", "HEAD"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        .stdout.decode("UTF-8")
+        .strip()
+    )
+    status = subprocess.run(
+        ["git", "-C", directory, "status", "--porcelain", "--untracked-files=no"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    ).stdout.decode("UTF-8")
+    if not commit:
+        return "unknown"
+    return f"{commit}-dirty" if status.strip() else commit
+
+
+def load_results(results_dir: str, ref: str) -> dict:
+    """
+    Loads saved suite results, given either the path of a results file or a git ref whose commit
+    has results in the results directory.
+
+    Parameters
+    ----------
+    results_dir : str
+        the directory containing the saved results
+    ref : str
+        path of a results file or git ref
+    """
+    path = ref
+    if not os.path.isfile(path):
+        commit = (
+            subprocess.run(
+                ["git", "rev-parse", "--short", ref],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+            .stdout.decode("UTF-8")
+            .strip()
+            or ref
+        )
+        path = os.path.join(results_dir, f"{commit}.json")
+        # results measured with uncommitted changes on top of the commit
+        if not os.path.isfile(path):
+            path = os.path.join(results_dir, f"{commit}-dirty.json")
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+if __name__ == "__main__":
+
+    def cmd_config(args: argparse.Namespace) -> int:
+        bench_config(args.clusters, args.files, args.repeat)
+        return 0
+
+    def cmd_yaml(args: argparse.Namespace) -> int:
+        bench_yaml(args.root, args.instance, args.repeat)
+        return 0
+
+    def cmd_suite(args: argparse.Namespace) -> int:
+        parameters = {
+            "clusters": args.clusters,
+            "groups": args.groups,
+            "depth": args.depth,
+            "apps_per_group": args.apps_per_group,
+            "projects": args.projects,
+        }
+        with tempfile.TemporaryDirectory() as root:
+            results = bench_suite(root, parameters, args.repeat, args.jobs)
+
+        print(f"{'benchmark':<14} {'time [s]':>10}")
+        for name, seconds in results.items():
+            print(f"{name:<14} {seconds:>10.4f}")
+
+        if args.save:
+            commit = git_commit()
+            os.makedirs(args.results_dir, exist_ok=True)
+            path = os.path.join(args.results_dir, f"{commit}.json")
+            with open(path, "w") as f:
+                json.dump(
+                    {
+                        "commit": commit,
+                        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+                        "parameters": dict(parameters, jobs=args.jobs),
+                        "results": results,
+                    },
+                    f,
+                    indent=2,
+                )
+            print(f"Results saved to {path}")
+        return 0
+
+    def cmd_compare(args: argparse.Namespace) -> int:
+        try:
+            base = load_results(args.results_dir, args.base)
+            other = load_results(args.results_dir, args.other)
+        except (OSError, ValueError) as e:
+            print(f"error: {e}", file=sys.stderr)
+            return 1
+        if base["parameters"] != other["parameters"]:
+            print(
+                "warning: the results have been measured with different parameters",
+                file=sys.stderr,
+            )
+
+        print(
+            f"{'benchmark':<14} {base['commit']:>14} {other['commit']:>14} {'change':>8}"
+        )
+        for name, seconds in base["results"].items():
+            if name not in other["results"]:
+                continue
+            new = other["results"][name]
+            change = (new - seconds) / seconds * 100 if seconds else 0.0
+            print(f"{name:<14} {seconds:>14.4f} {new:>14.4f} {change:>+7.1f}%")
+        return 0
+
+    def int_list(value: str) -> list:
+        return [int(v) for v in value.split(",")]
+
+    parser = argparse.ArgumentParser(description="Benchmark the render tool.")
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="number of runs per measurement, the fastest one is reported (default: 3)",
+    )
+    subparsers = parser.add_subparsers(dest="cmd")
+
+    config_parser = subparsers.add_parser(
+        "config", help="benchmark loading the instance config"
+    )
+    config_parser.add_argument(
+        "--clusters",
+        type=int_list,
+        default=[1000, 2000, 5000],
+        help="comma separated list of cluster counts (default: 1000,2000,5000)",
+    )
+    config_parser.add_argument(
+        "--files",
+        type=int,
+        default=20,
+        help="number of additional config files per instance (default: 20)",
+    )
+    config_parser.set_defaults(func=cmd_config)
+
+    yaml_parser = subparsers.add_parser(
+        "yaml", help="compare the yaml backends on the instance configuration files"
+    )
+    yaml_parser.add_argument("--root", default=".", help="root directory")
+    yaml_parser.add_argument(
+        "--instance",
+        action="append",
+        default=[],
+        help="name of the instance to parse (can be used multiple times, default: all instances)",
+    )
+    yaml_parser.set_defaults(func=cmd_yaml)
+
+    results_dir = os.path.join(render.default_cache_dir(), "benchmarks")
+
+    suite_parser = subparsers.add_parser(
+        "suite", help="benchmark all processing steps on a generated repository"
+    )
+    suite_parser.add_argument(
+        "--clusters", type=int, default=200, help="number of clusters (default: 200)"
+    )
+    suite_parser.add_argument(
+        "--groups", type=int, default=10, help="number of groups per tier (default: 10)"
+    )
+    suite_parser.add_argument(
+        "--depth", type=int, default=3, help="number of nested group tiers (default: 3)"
+    )
+    suite_parser.add_argument(
+        "--apps-per-group",
+        type=int,
+        default=3,
+        help="number of applications per group (default: 3)",
+    )
+    suite_parser.add_argument(
+        "--projects", type=int, default=3, help="number of projects (default: 3)"
+    )
+    suite_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of parallel helm calls of the render benchmark (default: 1)",
+    )
+    suite_parser.add_argument(
+        "--save",
+        default=False,
+        action="store_true",
+        help="save the results as <results-dir>/<commit>.json",
+    )
+    suite_parser.add_argument(
+        "--results-dir",
+        default=results_dir,
+        help="directory for saved results (default: %(default)s)",
+    )
+    suite_parser.set_defaults(func=cmd_suite)
+
+    compare_parser = subparsers.add_parser(
+        "compare", help="compare saved suite results of two commits"
+    )
+    compare_parser.add_argument("base", help="git ref or path of the baseline results")
+    compare_parser.add_argument(
+        "other", help="git ref or path of the results to compare"
+    )
+    compare_parser.add_argument(
+        "--results-dir",
+        default=results_dir,
+        help="directory for saved results (default: %(default)s)",
+    )
+    compare_parser.set_defaults(func=cmd_compare)
+
+    args = parser.parse_args()
+    if not args.cmd:
+        parser.print_help()
+        sys.exit(1)
+
+    sys.exit(args.func(args))
@@ -5,6 +5,9 @@
 #
 # If a clustername is provided as argument only the applications of the given cluster will be rendered.
 #
+# The helm calls are executed in parallel, the number of parallel calls can be set with the JOBS
+# environment variable (default: number of available cpus).
+#
 # Note: because it is possible und perfectly valid for applications to be listed for a cluster but
 #       to only exist in a certain branch/tag, warnings about "missing" applications are to be expected.
 #       The script treats these strictly as warnings because it assumes that the application exists
@@ -13,23 +16,19 @@
 export PATH=~/.local/bin:$PATH
 
 RENDERPY="hacks/render.py"
-INSTANCEDIR="instances"
 
 CLUSTER="${1:-.*}"
+JOBS="${JOBS:-$(nproc 2>/dev/null || echo 1)}"
 
 RC=0
 
-for chartyaml in $(find "${INSTANCEDIR}" -name 'Chart.yaml'); do
-    instance=$(basename $(dirname $chartyaml))
-    echo "# Checking instance: '${instance}'"
-
-    "${RENDERPY}" --instance "${instance}" render --quiet --warn-notfound ${RENDERPY_ARGS} "${CLUSTER}"
-    if [ $? -gt 0 ]; then
-        RC=1
-    fi
-    echo
-    echo
-done
+# all instances are rendered by a single process, sharing the helm calls and caches
+"${RENDERPY}" --all-instances render --quiet --warn-notfound --jobs "${JOBS}" ${RENDERPY_ARGS} "${CLUSTER}"
+if [ $? -gt 0 ]; then
+    RC=1
+fi
+echo
+echo
 if [ ${RC} -gt 0 ]; then
     echo "Check found errors, check the log output above!"
 else
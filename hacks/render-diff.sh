@@ -2,6 +2,10 @@
 #
 # Simple script to create application diffs between branches of the ocp-argocd repository
 #
+# Both branches are rendered from temporary git worktrees (see "render.py diff"), so the
+# current working tree is not touched and only applications whose inputs differ are rendered.
+# Like "diff -uw", differences in whitespace only are ignored.
+#
 # Examples:
 #   * render-diff ".*" ".*" master feature/foo .
 #     -> diff of render all apps on all clusters in all stages between the master and the "feature/foo" branch
@@ -29,36 +33,16 @@ else
     OUT_DIR="$(realpath "${5}")"
     STAGES=$(echo -n "${6:-"dev,int,prod"}" | tr ',' ' ')
 fi
+JOBS="${JOBS:-$(nproc 2>/dev/null || echo 1)}"
 
 GIT_ROOT=$(realpath "$(dirname "${0}")/.." )
 cd "${GIT_ROOT}"
 
-ORIG_BRANCH=$(git rev-parse --abbrev-ref HEAD 2>/dev/null)
-function cleanup {
-    git checkout "${ORIG_BRANCH}"
-}
-
-trap cleanup INT EXIT
-
-git checkout "${SRC_BRANCH}"
-
 if ! [ -d "${OUT_DIR}" ]; then
     mkdir "${OUT_DIR}"
 fi
 
 for stage in ${STAGES}
 do
-    ./hacks/render.py --instance=${stage} render "${CLUSTER_REGEX}" "${APP_REGEX}" > "${OUT_DIR}/${stage}-src.yaml"
-done
-
-git checkout "${DEST_BRANCH}"
-
-for stage in ${STAGES}
-do
-    ./hacks/render.py --instance=${stage} render "${CLUSTER_REGEX}" "${APP_REGEX}" > "${OUT_DIR}/${stage}-dest.yaml"
-done
-
-for stage in ${STAGES}
-do
-    diff -uw "${OUT_DIR}/${stage}-src.yaml" "${OUT_DIR}/${stage}-dest.yaml" > "${OUT_DIR}/${stage}.diff"
+    ./hacks/render.py --instance=${stage} diff --ignore-all-space --jobs "${JOBS}" "${SRC_BRANCH}" "${DEST_BRANCH}" "${CLUSTER_REGEX}" "${APP_REGEX}" > "${OUT_DIR}/${stage}.diff"
 done
@@ -19,8 +19,8 @@ what ArgoCD would do.
 
 The core construct is an "instance", which is basically a directory that contains the configuration consisting
 of a list of clusters, applications and groups. The actual format is documented in the config itself, so check that for
-details. The script always operates on a single instance, but on an arbitrary amount of applications and clusters in this
-instance.
+details. The script usually operates on a single instance, but on an arbitrary amount of applications and clusters in this
+instance; the render command can also process multiple (or all) instances in one run.
 
 The primary function of this script is to gather all required value files for an application on a given cluster, and
 execute a render command (again, normally "helm template") to produce the kubernetes resource yamls for this application.
@@ -33,34 +33,493 @@ applications one or more clusters in an instance.
 
 import argparse
 import atexit
+import contextlib
+import cProfile
+import ctypes
+import ctypes.util
+import difflib
+import hashlib
+import io
+import json
 import os
+import pickle
 import re
+import shutil
+import signal
+import socket
+import struct
 import subprocess
 import sys
-from copy import deepcopy
+import tarfile
+import tempfile
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from copy import copy
 from pathlib import Path
-from typing import Union
+from typing import BinaryIO, Union
 
 import yaml
 
-# deep_merge by https://gist.github.com/tfeldmann
+
+class Profiler:
+    """
+    The Profiler class collects the wall time of the phases of a run (config loading, value file
+    resolution, helm calls...) and counts events in hot paths (deep merges, filesystem checks,
+    subprocess spawns...).
+
+    A disabled profiler ignores all calls, so the instrumentation costs next to nothing unless
+    profiling has been requested.
+
+    Attributes
+    ----------
+    enabled : bool
+        whether phases and events are recorded
+    """
+
+    def __init__(self, enabled: bool = False) -> None:
+        """
+        Parameters
+        ----------
+        enabled : bool, optional
+            whether phases and events are recorded; the default is False
+        """
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._phases = {}
+        self._counters = {}
+        self._events = []
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        """
+        Context manager recording the wall time of the enclosed code as a phase. Phases can be
+        nested and can run in parallel in worker threads, so their times add up to more than the
+        total runtime.
+
+        Parameters
+        ----------
+        name : str
+            the name of the phase
+        """
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            with self._lock:
+                calls, seconds = self._phases.get(name, (0, 0.0))
+                self._phases[name] = (calls + 1, seconds + end - start)
+                self._events.append((name, start, end, threading.get_ident()))
+
+    def count(self, name: str, n: int = 1) -> None:
+        """
+        Increments the counter with the given name.
+
+        Parameters
+        ----------
+        name : str
+            the name of the counter
+        n : int, optional
+            the increment; the default is 1
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def print_summary(self, file=sys.stderr) -> None:
+        """
+        Prints a table of all phases (calls, total and mean time) and counters.
+
+        Parameters
+        ----------
+        file : file object, optional
+            the file to print to; the default is stderr
+        """
+        total = time.perf_counter() - self._origin
+        print(f"Profile ({total:.3f}s total):", file=file)
+        print(
+            f"  {'phase':<32} {'calls':>8} {'total [s]':>10} {'mean [ms]':>10}",
+            file=file,
+        )
+        for name, (calls, seconds) in sorted(
+            self._phases.items(), key=lambda item: item[1][1], reverse=True
+        ):
+            print(
+                f"  {name:<32} {calls:>8} {seconds:>10.3f} {seconds / calls * 1000:>10.3f}",
+                file=file,
+            )
+        if self._counters:
+            print(f"  {'counter':<32} {'count':>8}", file=file)
+            for name, count in sorted(self._counters.items()):
+                print(f"  {name:<32} {count:>8}", file=file)
+
+    def write_trace(self, path: str) -> None:
+        """
+        Writes all recorded phases as Chrome trace events (viewable with chrome://tracing or
+        https://ui.perfetto.dev), one track per thread.
+
+        Parameters
+        ----------
+        path : str
+            the path of the trace file
+        """
+        pid = os.getpid()
+        events = [
+            {
+                "name": name,
+                "ph": "X",
+                "ts": (start - self._origin) * 1e6,
+                "dur": (end - start) * 1e6,
+                "pid": pid,
+                "tid": tid,
+            }
+            for name, start, end, tid in self._events
+        ]
+        events.extend(
+            {"name": name, "ph": "C", "ts": 0, "pid": pid, "args": {name: count}}
+            for name, count in self._counters.items()
+        )
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+# the profiler instrumenting this module, enabled by the --profile options
+PROFILER = Profiler()
+
+
+# deep_merge based on https://gist.github.com/tfeldmann
 # source: https://gist.github.com/angstwad/bf22d1822c38a92ec0a9?permalink_comment_id=4038517#gistcomment-4038517
 # "My version which passes this test (MIT license):"
 def deep_merge(a: dict, b: dict) -> dict:
-    result = deepcopy(a)
+    """
+    Returns the deep merge of two dicts without modifying them, with the values of b taking precedence.
+
+    Only the dicts on the path to a merged key are copied, all other values are shared with the
+    operands (structural sharing). The result must therefore be treated as read-only, just like
+    the operands.
+
+    Parameters
+    ----------
+    a : dict
+        the dict with the lower priority
+    b : dict
+        the dict with the higher priority
+    """
+    PROFILER.count("deep_merge")
+    result = dict(a)
     for bk, bv in b.items():
-        av = result.get("k")
+        av = result.get(bk)
         if isinstance(av, dict) and isinstance(bv, dict):
             result[bk] = deep_merge(av, bv)
         else:
-            result[bk] = deepcopy(bv)
+            result[bk] = bv
     return result
 
 
+def deep_merge_into(target: dict, source: dict) -> dict:
+    """
+    Deep merges source into target in-place, with the values of source taking precedence, and
+    returns target.
+
+    Values of source are not copied but added to target as they are, so the caller must own
+    source (e.g. freshly parsed data) and must not use it afterwards.
+
+    Parameters
+    ----------
+    target : dict
+        the dict with the lower priority; modified in-place
+    source : dict
+        the dict with the higher priority
+    """
+    PROFILER.count("deep_merge_into")
+    for key, value in source.items():
+        current = target.get(key)
+        if isinstance(current, dict) and isinstance(value, dict):
+            deep_merge_into(current, value)
+        else:
+            target[key] = value
+    return target
+
+
+# the libyaml based loader/dumper are an order of magnitude faster than the pure python
+# implementation but are only available if pyyaml has been built with the C extension
+YAML_BACKENDS = {"python": (yaml.SafeLoader, yaml.SafeDumper)}
+if getattr(yaml, "__with_libyaml__", False):
+    YAML_BACKENDS["libyaml"] = (yaml.CSafeLoader, yaml.CSafeDumper)
+
+
+def yaml_backend(backend: str = "auto") -> tuple:
+    """
+    Returns the (loader, dumper) classes of the given yaml backend.
+
+    Parameters
+    ----------
+    backend : str, optional
+        the name of the backend ("libyaml" or "python"); the default "auto" uses libyaml if it is
+        available and falls back to the pure python implementation otherwise
+    """
+    if backend == "auto":
+        backend = "libyaml" if "libyaml" in YAML_BACKENDS else "python"
+    try:
+        return YAML_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(
+            f"yaml backend '{backend}' is not available (available: {', '.join(YAML_BACKENDS)})"
+        ) from None
+
+
+def default_cache_dir() -> str:
+    """Returns the default directory for persistent caches, following the XDG base directory specification."""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(cache_home, "render-py")
+
+
+def file_digest(path: Union[str, BinaryIO], digest=None):
+    """
+    Feeds the contents of the given file into a hash object and returns it.
+
+    Parameters
+    ----------
+    path : str|BinaryIO
+        the path of the file to hash or a binary file object, which is read from its current position
+    digest : hash object, optional
+        the hash object to update; a new sha256 hash object is created if None is provided
+    """
+    if digest is None:
+        digest = hashlib.sha256()
+    with contextlib.ExitStack() as stack:
+        f = path
+        if isinstance(path, str):
+            f = stack.enter_context(open(path, "rb"))
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest
+
+
+def walk_tree(root: str):
+    """
+    Generator like os.walk(root, followlinks=True), yielding (dirpath, dirnames, filenames) tuples with
+    normalized directory paths. Symlinked directories are followed, a directory is only skipped if it
+    is its own ancestor (a symlink cycle); multiple symlinks to the same directory are all walked, so
+    every path os.path.isfile()/isdir() accepts is reported.
+
+    Parameters
+    ----------
+    root : str
+        the directory to walk
+    """
+    # the real paths of each directory and its ancestors on the walked path
+    ancestors = {}
+    for dirpath, dirnames, filenames in os.walk(root, followlinks=True):
+        dirpath = os.path.normpath(dirpath)
+        realpath = os.path.realpath(dirpath)
+        parents = ancestors.get(os.path.dirname(dirpath), frozenset())
+        if realpath in parents:
+            dirnames[:] = []
+            continue
+        ancestors[dirpath] = parents | {realpath}
+        yield dirpath, dirnames, filenames
+
+
+def directory_digest(path: str) -> str:
+    """
+    Returns a hash over the names and contents of all files below the given directory.
+
+    Parameters
+    ----------
+    path : str
+        the path of the directory to hash
+    """
+    digest = hashlib.sha256()
+    for dirpath, dirnames, filenames in os.walk(path):
+        # walk the directory in a stable order so the hash does not depend on the filesystem
+        dirnames.sort()
+        for filename in sorted(filenames):
+            filepath = os.path.join(dirpath, filename)
+            digest.update(os.path.relpath(filepath, path).encode("UTF-8") + b"\0")
+            file_digest(filepath, digest)
+            digest.update(b"\0")
+    return digest.hexdigest()
+
+
+# a chart version (https://semver.org), as used in the name of chart archives
+SEMVER = r"v?\d+\.\d+\.\d+(?:-[0-9A-Za-z.-]+)?(?:\+[0-9A-Za-z.-]+)?"
+
+
+def chart_dependencies(chart: str) -> list:
+    """
+    Returns the dependencies declared by a helm chart (the "dependencies" list of its Chart.yaml or,
+    for apiVersion v1 charts, its requirements.yaml). Returns an empty list if the chart does not
+    declare dependencies or its metadata cannot be read.
+
+    Parameters
+    ----------
+    chart : str
+        the path to the helm chart
+    """
+    loader, _ = yaml_backend()
+    for filename in ("Chart.yaml", "requirements.yaml"):
+        try:
+            with open(os.path.join(chart, filename), "r") as f:
+                metadata = yaml.load(f, Loader=loader)
+        except (OSError, yaml.YAMLError):
+            continue
+        if isinstance(metadata, dict) and metadata.get("dependencies"):
+            return [d for d in metadata["dependencies"] if isinstance(d, dict)]
+    return []
+
+
 class NamingConflict(Exception):
     pass
 
 
+class GroupCycle(Exception):
+    pass
+
+
+class FileIndex:
+    """
+    The FileIndex class is an in-memory index of all files and directories below a set of
+    root directories. It is built with a single scan of the root directories and answers
+    existence checks without touching the filesystem, which avoids hundreds of thousands of
+    stat calls when resolving the value files of many applications on many clusters.
+
+    Checks for paths outside of the root directories are passed on to the filesystem.
+
+    Attributes
+    ----------
+    roots : list
+        the (normalized) root directories covered by the index
+    """
+
+    def __init__(self, roots: list) -> None:
+        """
+        Parameters
+        ----------
+        roots : list
+            the directories to index
+        """
+        self.roots = [os.path.normpath(root) for root in roots]
+        self._lock = threading.Lock()
+        self._files = None
+        self._dirs = None
+
+    def covers(self, path: str) -> bool:
+        """
+        Returns True if the given path is below one of the root directories of the index.
+
+        Parameters
+        ----------
+        path : str
+            the path to check
+        """
+        path = os.path.normpath(path)
+        for root in self.roots:
+            if path == root or path.startswith(root + os.sep):
+                return True
+        return False
+
+    def isfile(self, path: str) -> bool:
+        """
+        Returns True if the given path is an existing file (equivalent to os.path.isfile).
+
+        Parameters
+        ----------
+        path : str
+            the path to check
+        """
+        if not self.covers(path):
+            PROFILER.count("fs.stat")
+            return os.path.isfile(path)
+        self._scan()
+        return os.path.normpath(path) in self._files
+
+    def isdir(self, path: str) -> bool:
+        """
+        Returns True if the given path is an existing directory (equivalent to os.path.isdir).
+
+        Parameters
+        ----------
+        path : str
+            the path to check
+        """
+        if not self.covers(path):
+            PROFILER.count("fs.stat")
+            return os.path.isdir(path)
+        self._scan()
+        return os.path.normpath(path) in self._dirs
+
+    def invalidate(self) -> None:
+        """
+        Drops the index, the root directories are scanned again on the next check.
+        """
+        with self._lock:
+            self._files = None
+            self._dirs = None
+
+    def update(self, path: str, exists: bool, isdir: bool = False) -> None:
+        """
+        Records the creation or deletion of a file or directory. For a created directory, its
+        contents are scanned, for a deleted directory, all entries below it are dropped.
+
+        Parameters
+        ----------
+        path : str
+            the path of the created or deleted file or directory
+        exists : bool
+            True if the path has been created, False if it has been deleted
+        isdir : bool, optional
+            whether the path is a directory; the default is False
+        """
+        path = os.path.normpath(path)
+        if not self.covers(path):
+            return
+        with self._lock:
+            if self._files is None:
+                return
+            if isdir and exists:
+                self._walk(self._files, self._dirs, [path])
+            elif isdir:
+                prefix = path + os.sep
+                self._dirs = {
+                    d for d in self._dirs if d != path and not d.startswith(prefix)
+                }
+                self._files = {f for f in self._files if not f.startswith(prefix)}
+            elif exists:
+                self._files.add(path)
+            else:
+                self._files.discard(path)
+
+    def _scan(self) -> None:
+        # lazy loading, only scan the filesystem once something is checked
+        with self._lock:
+            if self._files is not None:
+                return
+
+            files = set()
+            dirs = set()
+            with PROFILER.phase("fs.index_scan"):
+                self._walk(files, dirs)
+            self._dirs = dirs
+            self._files = files
+
+    def _walk(self, files: set, dirs: set, roots: list = None) -> None:
+        for root in self.roots if roots is None else roots:
+            for dirpath, _, filenames in walk_tree(root):
+                dirs.add(dirpath)
+                for filename in filenames:
+                    files.add(os.path.join(dirpath, filename))
+
+
 class DirectoryLayout:
     """
     A class to model the directory structure for instances, applications and values.
@@ -108,6 +567,9 @@ class DirectoryLayout:
     shared : str
         the path to the shared charts directory, containing the helm charts that can
         be used by multiple projects
+    index : FileIndex|None
+        the index used to check whether files and directories below the projects and shared
+        charts directories exist; None if existence checks go to the filesystem directly
     """
 
     def __init__(
@@ -120,6 +582,7 @@ class DirectoryLayout:
         clusters: str = "clusters",
         groups: str = "groups",
         shared: str = "shared/charts",
+        use_index: bool = True,
     ) -> None:
         """
         Parameters
@@ -143,6 +606,10 @@ class DirectoryLayout:
         shared : str
             the path to the shared charts directory, containing the helm charts that can
             be used by multiple projects
+        use_index : bool, optional
+            whether to check the existence of files and directories below the projects and
+            shared charts directories against an index built by a single scan instead of the
+            filesystem; the default is True
         """
         self._root = root
         self._instances = instances
@@ -152,11 +619,37 @@ class DirectoryLayout:
         self._clusters = clusters
         self._groups = groups
         self._shared = shared
+        self._use_index = use_index
 
     @property
     def root(self) -> str:
         return self._root
 
+    def with_root(self, root: str) -> "DirectoryLayout":
+        """Returns a copy of the layout with a different root directory, e.g. for another checkout.
+
+        Parameters
+        ----------
+        root : str
+            the path of the root directory of the new layout
+        """
+        layout = copy(self)
+        layout._root = root
+        # the index belongs to the old root directory
+        layout.__dict__.pop("_index", None)
+        return layout
+
+    @property
+    def index(self) -> Union[FileIndex, None]:
+        if not self._use_index:
+            return None
+        # lazy loading, only create the index when someone tries to use it
+        try:
+            return self._index
+        except AttributeError:
+            self._index = FileIndex([self.projects, self.shared])
+            return self._index
+
     @property
     def instances(self) -> str:
         return os.path.join(self._root, self._instances)
@@ -199,6 +692,19 @@ class DirectoryLayout:
         """
         return os.path.join(self.instances, instance)
 
+    def instance_names(self) -> list:
+        """Returns the sorted names of all instances, i.e. all directories in the instances directory
+        containing a Chart.yaml."""
+        try:
+            names = os.listdir(self.instances)
+        except FileNotFoundError:
+            return []
+        return sorted(
+            name
+            for name in names
+            if os.path.isfile(os.path.join(self.instance(name), "Chart.yaml"))
+        )
+
     def project(self, project: str) -> str:
         """Returns the path to the project directory of a specific instance.
 
@@ -305,6 +811,32 @@ class DirectoryLayout:
         """
         return os.path.join(self.shared, chart)
 
+    def isfile(self, path: str) -> bool:
+        """Returns True if the given path is an existing file, using the index if enabled.
+
+        Parameters
+        ----------
+        path : str
+            the path to check
+        """
+        if self.index is None:
+            PROFILER.count("fs.stat")
+            return os.path.isfile(path)
+        return self.index.isfile(path)
+
+    def isdir(self, path: str) -> bool:
+        """Returns True if the given path is an existing directory, using the index if enabled.
+
+        Parameters
+        ----------
+        path : str
+            the path to check
+        """
+        if self.index is None:
+            PROFILER.count("fs.stat")
+            return os.path.isdir(path)
+        return self.index.isdir(path)
+
 
 class ConfigModel:
     """
@@ -319,6 +851,8 @@ class ConfigModel:
         is created.
     """
 
+    __slots__ = ("_layout",)
+
     def __init__(self, layout: DirectoryLayout) -> None:
         """
         Parameters
@@ -357,6 +891,9 @@ class Application(ConfigModel):
     accept and strict what you return" concept in that it just converts all keys
     of the application config dict to read-only class attributes.
 
+    Application objects are immutable, so they can safely be shared between clusters
+    (and threads). Merging two applications creates a new object (see __add__).
+
     All attributes listed below are in addition to the ones extracted from the config.
 
     Attributes
@@ -373,6 +910,8 @@ class Application(ConfigModel):
         if the application has not secrets.yaml file
     """
 
+    __slots__ = ("_config",)
+
     def __init__(self, config: dict, layout: DirectoryLayout = None) -> None:
         """
         Parameters
@@ -383,20 +922,35 @@ class Application(ConfigModel):
             the directory layout to use
         """
         super().__init__(layout)
-
-        self.project = "default"
-        self.namespace = "default"
-        for key, value in config.items():
-            setattr(self, key, value)
+        object.__setattr__(
+            self, "_config", {"project": "default", "namespace": "default", **config}
+        )
 
         if self.name == self.layout.common_id:
             raise NamingConflict(
                 f"An application cannot be named '{self.layout.common_id}' as this conflicts with the '{self.layout.common_id}.yaml' file of groups!"
             )
 
+    def __getattr__(self, name: str):
+        # only called if there is no regular attribute, so everything else is looked up in the config
+        if not name.startswith("_"):
+            try:
+                return self._config[name]
+            except KeyError:
+                pass
+        raise AttributeError(
+            f"'{type(self).__name__}' object has no attribute '{name}'"
+        )
+
+    def __setattr__(self, name: str, value) -> None:
+        # the layout is the only thing that may be set after instantiation (see ConfigModel.layout)
+        if name != "_layout":
+            raise AttributeError(f"'{type(self).__name__}' objects are immutable")
+        object.__setattr__(self, name, value)
+
     @property
     def exists(self) -> bool:
-        return os.path.isdir(self.path)
+        return self.layout.isdir(self.path)
 
     @property
     def path(self) -> str:
@@ -418,7 +972,7 @@ class Application(ConfigModel):
         if not must_exist:
             return path
 
-        if os.path.isfile(path):
+        if self.layout.isfile(path):
             return path
         return None
 
@@ -438,7 +992,7 @@ class Application(ConfigModel):
         if not must_exist:
             return path
 
-        if os.path.isfile(path):
+        if self.layout.isfile(path):
             return path
         return None
 
@@ -461,7 +1015,7 @@ class Application(ConfigModel):
     def __add__(self, other):
         """Override the + operator for Application objects.
 
-        Merges two Application objects according to the following rules:
+        Merges two Application objects into a new Application object according to the following rules:
         * scalar values and lists of the first operand are overwritten by values of the second operand
           (data types do not have to match, a string can be overwritten by a dict etc.)
         * if the second operand has a value the first operand is missing, it will be added
@@ -469,18 +1023,16 @@ class Application(ConfigModel):
           the "lower" priority (i.e. in case of a conflict, the value in the dict of the first
           operand will be overwritten by the value in the dict of the second operand)
 
-        This process modifies the first operand! This means it always behaves like
-        "a = a + b" and not like "c = a + b". Time will tell if this can be considered a bug or
-        a feature.
+        Neither operand is modified.
         """
-        for key, other_value in other.__dict__.items():
-            self_value = getattr(self, key, None)
-            if isinstance(self_value, dict):
-                new_value = deep_merge(self_value, other_value)
-                setattr(self, key, new_value)
+        config = dict(self._config)
+        for key, other_value in other._config.items():
+            self_value = config.get(key)
+            if isinstance(self_value, dict) and isinstance(other_value, dict):
+                config[key] = deep_merge(self_value, other_value)
             else:
-                setattr(self, key, other_value)
-        return self
+                config[key] = other_value
+        return Application(config, self.layout)
 
 
 class ClusterGroupApps(ConfigModel):
@@ -493,8 +1045,12 @@ class ClusterGroupApps(ConfigModel):
     ----------
     groups : dict
         each key in the "groups" attribute is the name of a group and is itself
-        a dict with two keys: "applications" (dict of Applications) and "excludes"
-        (list of application names).
+        a dict with three keys: "applications" (dict of Applications), "excludes"
+        (list of application names) and "groups" (list of nested group names).
+    values_file_paths_hits : int
+        number of group_values_file_paths() calls answered from the memo
+    values_file_paths_misses : int
+        number of group_values_file_paths() calls that had to resolve the value files
     """
 
     def __init__(self, config: dict, layout: DirectoryLayout = None) -> None:
@@ -508,6 +1064,15 @@ class ClusterGroupApps(ConfigModel):
         """
         super().__init__(layout)
         self.groups = {}
+        # many clusters share the same group list, so the value files resolved for a
+        # (project, application, flags, groups) combination are shared by all of them
+        self._values_file_paths = {}
+        self._values_file_paths_lock = threading.Lock()
+        self.values_file_paths_hits = 0
+        self.values_file_paths_misses = 0
+        # merged applications per group list prefix, see apps()
+        self._apps_prefixes = {(): {}}
+        self._apps_lock = threading.Lock()
 
         for name, group in config.items():
             self.groups[name] = {
@@ -519,6 +1084,76 @@ class ClusterGroupApps(ConfigModel):
                 app = Application(app_config, self.layout)
                 self.groups[name]["applications"][app.name] = app
 
+        self._closures = self._resolve_closures()
+
+    def _resolve_closures(self) -> dict:
+        """
+        Resolves the nested groups of all groups and returns a dict mapping each group to its closure, i.e.
+        the ordered list of the group itself followed by all groups it (transitively) pulls in. The order
+        is the same as a depth first search starting at the group would visit them.
+
+        The closures are built bottom up (in topological order), so the closure of each group is computed
+        exactly once and can be reused by all groups nesting it. Raises GroupCycle if nested groups form
+        a cycle.
+        """
+        closures = {}
+        for start in self.groups:
+            if start in closures:
+                continue
+
+            # iterative depth first search, the stack holds the current path and, for each group on the
+            # path, an iterator over the nested groups that still need to be visited
+            stack = [(start, iter(self.group_subgroups(start)))]
+            on_path = {start}
+            while stack:
+                group, subgroups = stack[-1]
+                for subgroup in subgroups:
+                    if subgroup in closures:
+                        continue
+                    if subgroup in on_path:
+                        cycle = [g for g, _ in stack] + [subgroup]
+                        cycle = cycle[cycle.index(subgroup) :]
+                        raise GroupCycle(
+                            f"Nested groups form a cycle: {' -> '.join(cycle)}"
+                        )
+                    stack.append((subgroup, iter(self.group_subgroups(subgroup))))
+                    on_path.add(subgroup)
+                    break
+                else:
+                    # all nested groups are resolved, so the closure of the group is the group
+                    # itself followed by the closures of the nested groups
+                    stack.pop()
+                    on_path.discard(group)
+                    closure = [group]
+                    visited = {group}
+                    for subgroup in self.group_subgroups(group):
+                        for member in closures[subgroup]:
+                            if member not in visited:
+                                visited.add(member)
+                                closure.append(member)
+                    closures[group] = closure
+        return closures
+
+    def group_closure(self, group: str) -> list:
+        """Returns the given group followed by all groups it (transitively) pulls in via nested groups.
+
+        Parameters
+        ----------
+        group : str
+            the name of the group for which the closure should be retrieved
+        """
+        return self._closures.get(group, [group])
+
+    def group_subgroups(self, group: str) -> list:
+        """Retrieves the list of groups nested in the given group.
+
+        Parameters
+        ----------
+        group : str
+            the name of the group for which the nested groups should be retrieved
+        """
+        return self.groups.get(group, {}).get("groups", [])
+
     def apps(self, groups: list) -> dict:
         """
         Given a list of group names, this method returns a dictionary of applications belonging to these groups with all
@@ -531,25 +1166,50 @@ class ClusterGroupApps(ConfigModel):
         Excludes are applied for each group individually, i.e. an exclude in a group can only remove applications
         of lower priority groups.
 
+        Clusters typically share long group list prefixes, so the intermediate result for each group list
+        prefix is cached and only the groups following the longest already resolved prefix are merged.
+
         Parameters
         ----------
         groups : list
             list of group names for which to retrieve the applications
         """
-        result = {}
-        for group in groups:
-            apps = self.group_apps(group)
-            excludes = self.group_excludes(group)
+        groups = tuple(groups)
+        with self._apps_lock:
+            length = len(groups)
+            while groups[:length] not in self._apps_prefixes:
+                length -= 1
 
-            for name, app in apps.items():
-                if name in result:
-                    result[name] = result[name] + app
-                else:
-                    result[name] = app
+            result = self._apps_prefixes[groups[:length]]
+            for length in range(length + 1, len(groups) + 1):
+                result = self._merge_group_apps(result, groups[length - 1])
+                self._apps_prefixes[groups[:length]] = result
+
+        # the cached dicts are shared, callers get their own copy
+        return dict(result)
+
+    def _merge_group_apps(self, apps: dict, group: str) -> dict:
+        """
+        Returns a new dict with the applications of the given group merged into the given applications and
+        the excludes of the group applied. The given dict is not modified.
+
+        Parameters
+        ----------
+        apps : dict
+            the applications of the lower priority groups
+        group : str
+            the name of the group to merge
+        """
+        result = dict(apps)
+        for name, app in self.group_apps(group).items():
+            if name in result:
+                result[name] = result[name] + app
+            else:
+                result[name] = app
 
-            for exclude in excludes:
-                if exclude in result:
-                    del result[exclude]
+        for exclude in self.group_excludes(group):
+            if exclude in result:
+                del result[exclude]
 
         return result
 
@@ -563,6 +1223,94 @@ class ClusterGroupApps(ConfigModel):
         """
         return self.groups.get(group, {}).get("applications", {})
 
+    def group_values_file_paths(
+        self, app: Application, groups: list, must_exist: bool = True
+    ) -> list:
+        """
+        Returns the path to all existing value files for the given application in the given groups.
+
+        The result only depends on the application project, name and addDefaultCommon* flags and on the
+        group list, so it is memoized per combination of these.
+
+        Parameters
+        ----------
+        app : Application
+            the application for which the value files should be retrieved
+        groups : list
+            the ordered list of groups (including nested groups) for which the value files should be retrieved
+        must_exist : bool, optional
+            if False, the paths of all value files that would be used if they existed are returned
+        """
+        add_common_values = bool(getattr(app, "addDefaultCommonValues", False))
+        add_common_secrets = bool(getattr(app, "addDefaultCommonSecrets", False))
+        key = (
+            app.project,
+            app.name,
+            add_common_values,
+            add_common_secrets,
+            tuple(groups),
+            must_exist,
+        )
+
+        with self._values_file_paths_lock:
+            try:
+                result = self._values_file_paths[key]
+                self.values_file_paths_hits += 1
+                return list(result)
+            except KeyError:
+                self.values_file_paths_misses += 1
+
+            result = []
+            for group in groups:
+                default_common_values_path = self.layout.group_values_file(
+                    "default", group, f"{self.layout.common_id}.yaml"
+                )
+                default_common_secrets_path = self.layout.group_values_file(
+                    "default", group, f"secrets-{self.layout.common_id}.yaml"
+                )
+                common_values_path = self.layout.group_values_file(
+                    app.project, group, f"{self.layout.common_id}.yaml"
+                )
+                common_secrets_path = self.layout.group_values_file(
+                    app.project, group, f"secrets-{self.layout.common_id}.yaml"
+                )
+                values_path = self.layout.group_values_file(
+                    app.project, group, f"{app.name}.yaml"
+                )
+                secrets_path = self.layout.group_values_file(
+                    app.project, group, f"secrets-{app.name}.yaml"
+                )
+
+                paths = []
+                if add_common_values:
+                    paths.append(default_common_values_path)
+
+                if add_common_secrets:
+                    paths.append(default_common_secrets_path)
+
+                paths.extend(
+                    [
+                        common_values_path,
+                        common_secrets_path,
+                        values_path,
+                        secrets_path,
+                    ]
+                )
+
+                for path in paths:
+                    if not must_exist or self.layout.isfile(path):
+                        result.append(path)
+
+            self._values_file_paths[key] = result
+            return list(result)
+
+    def clear_values_file_paths(self) -> None:
+        """
+        Drops the memoized group value files, e.g. after value files have been created or deleted.
+        """
+        with self._values_file_paths_lock:
+            self._values_file_paths = {}
+
     def group_excludes(self, group: str) -> list:
         """Retrieves the list of application names the given group excludes.
 
@@ -640,21 +1388,16 @@ class Cluster(ConfigModel):
         try:
             return self._groups
         except AttributeError:
-            self._groups = []
+            groups = []
             visited = set()
-
-            # Depth First Search implementation to resolve nested groups
-            # https://favtutor.com/blogs/depth-first-search-python
-            def _dfs(visited: set, graph: ClusterGroupApps, node: str) -> None:
-                if node not in visited:
-                    visited.add(node)
-                    self._groups.append(node)
-                    for neighbour in graph.groups.get(node, {}).get("groups", []):
-                        _dfs(visited, graph, neighbour)
-
+            # each group is followed by the groups it pulls in via nested groups, groups that
+            # have already been pulled in by a previous group are skipped
             for group in self._raw_groups:
-                _dfs(visited, self._cluster_group_apps, group)
-
+                for member in self._cluster_group_apps.group_closure(group):
+                    if member not in visited:
+                        visited.add(member)
+                        groups.append(member)
+            self._groups = groups
             return self._groups
 
     @property
@@ -663,6 +1406,9 @@ class Cluster(ConfigModel):
         try:
             return self._applications
         except AttributeError:
+            pass
+
+        with PROFILER.phase("cluster.applications"):
             cluster_apps = self._cluster_group_apps.apps(self.groups)
 
             for app_config in self._apps:
@@ -676,8 +1422,8 @@ class Cluster(ConfigModel):
                 if exclude in cluster_apps:
                     del cluster_apps[exclude]
 
-            self._applications = cluster_apps
-            return self._applications
+        self._applications = cluster_apps
+        return self._applications
 
     def select_applications(self, regex: str) -> dict:
         """
@@ -701,7 +1447,9 @@ class Cluster(ConfigModel):
         return result
 
     # get the path for a file in the cluster value directory
-    def app_cluster_values_file_paths(self, appname: str) -> list:
+    def app_cluster_values_file_paths(
+        self, appname: str, must_exist: bool = True
+    ) -> list:
         """
         Returns the path to all cluster value files for the given application.
 
@@ -709,6 +1457,8 @@ class Cluster(ConfigModel):
         ----------
         appname : str
             name of the application for which the value file should be retrieved
+        must_exist : bool, optional
+            if False, the paths of all value files that would be used if they existed are returned
         """
         app = self.applications[appname]
 
@@ -750,65 +1500,58 @@ class Cluster(ConfigModel):
         )
 
         for path in paths:
-            if os.path.isfile(path):
+            if not must_exist or self.layout.isfile(path):
                 result.append(path)
 
         return result
 
-    # get value paths relevant for the given application for one or more group values directories
-    def app_group_values_file_paths(self, appname: str) -> list:
+    def app_values_file_paths(self, appname: str, must_exist: bool = True) -> list:
         """
-        Returns the path to all value files for the given application in all groups the cluster has assigned.
+        Returns the ordered list of all existing value files for the given application, as passed to helm
+        (application values, addon values, group values, cluster values).
 
         Parameters
         ----------
         appname : str
             name of the application for which the value files should be retrieved
+        must_exist : bool, optional
+            if False, the paths of all value files that would be used if they existed are returned
         """
         app = self.applications[appname]
 
-        result = []
-        for group in self.groups:
-            default_common_values_path = self.layout.group_values_file(
-                "default", group, f"{self.layout.common_id}.yaml"
-            )
-            default_common_secrets_path = self.layout.group_values_file(
-                "default", group, f"secrets-{self.layout.common_id}.yaml"
-            )
-            common_values_path = self.layout.group_values_file(
-                app.project, group, f"{self.layout.common_id}.yaml"
-            )
-            common_secrets_path = self.layout.group_values_file(
-                app.project, group, f"secrets-{self.layout.common_id}.yaml"
-            )
-            values_path = self.layout.group_values_file(
-                app.project, group, f"{appname}.yaml"
-            )
-            secrets_path = self.layout.group_values_file(
-                app.project, group, f"secrets-{appname}.yaml"
-            )
-
-            paths = []
-            if hasattr(app, "addDefaultCommonValues") and app.addDefaultCommonValues:
-                paths.append(default_common_values_path)
+        with PROFILER.phase("cluster.value_paths"):
+            return self._app_values_file_paths(app, appname, must_exist)
+
+    def _app_values_file_paths(
+        self, app: Application, appname: str, must_exist: bool
+    ) -> list:
+        value_paths = []
+        value_paths.append(app.file_path("values.yaml", must_exist))
+        value_paths.append(app.file_path("secrets.yaml", must_exist))
+        value_paths.append(app.addon_file_path(f"{app.name}.yaml", must_exist))
+        value_paths.append(app.addon_file_path(f"secrets-{app.name}.yaml", must_exist))
+        value_paths.extend(self.app_group_values_file_paths(appname, must_exist))
+        value_paths.extend(self.app_cluster_values_file_paths(appname, must_exist))
+        return list(filter(None, value_paths))
 
-            if hasattr(app, "addDefaultCommonSecrets") and app.addDefaultCommonSecrets:
-                paths.append(default_common_secrets_path)
-
-            paths.extend(
-                [
-                    common_values_path,
-                    common_secrets_path,
-                    values_path,
-                    secrets_path,
-                ]
-            )
-
-            for path in paths:
-                if os.path.isfile(path):
-                    result.append(path)
+    # get value paths relevant for the given application for one or more group values directories
+    def app_group_values_file_paths(
+        self, appname: str, must_exist: bool = True
+    ) -> list:
+        """
+        Returns the path to all value files for the given application in all groups the cluster has assigned.
 
-        return result
+        Parameters
+        ----------
+        appname : str
+            name of the application for which the value files should be retrieved
+        must_exist : bool, optional
+            if False, the paths of all value files that would be used if they existed are returned
+        """
+        app = self.applications[appname]
+        return self._cluster_group_apps.group_values_file_paths(
+            app, self.groups, must_exist
+        )
 
 
 class Instance(ConfigModel):
@@ -831,9 +1574,26 @@ class Instance(ConfigModel):
         the full instance configuration as a dictionary
     clusters : dict
         a dictionary of clusters belonging to the instace; each dictionary key is the name of a cluster
+    snapshot_dir : str|None
+        directory in which a snapshot of the merged configuration is stored; as long as no configuration
+        file changes, the snapshot is loaded instead of parsing all files again; None disables snapshots
+    yaml_backend : str
+        the yaml backend used to parse the configuration files (see yaml_backend())
+    debug : bool
+        whether to print debug information, e.g. why a snapshot could not be used
     """
 
-    def __init__(self, name: str = "test", layout: DirectoryLayout = None):
+    # bump whenever the structure of the snapshot or of the merged configuration changes
+    SNAPSHOT_VERSION = 1
+
+    def __init__(
+        self,
+        name: str = "test",
+        layout: DirectoryLayout = None,
+        snapshot_dir: str = None,
+        yaml_backend: str = "auto",
+        debug: bool = False,
+    ):
         """
         Parameters
         ----------
@@ -841,9 +1601,20 @@ class Instance(ConfigModel):
             the name of the new instance
         layout : DirectoryLayout, optional
             the directory layout to use
+        snapshot_dir : str, optional
+            directory in which a snapshot of the merged configuration is stored; the default is not
+            to use snapshots
+        yaml_backend : str, optional
+            the yaml backend used to parse the configuration files; the default "auto" uses libyaml
+            if available
+        debug : bool, optional
+            whether to print debug information; the default is False
         """
         super().__init__(layout)
         self.name = name
+        self.snapshot_dir = snapshot_dir
+        self.yaml_backend = yaml_backend
+        self.debug = debug
         if not os.path.isdir(self.path):
             raise FileNotFoundError(f"No instance directory: {self.path}")
 
@@ -869,31 +1640,169 @@ class Instance(ConfigModel):
         try:
             return self._config
         except AttributeError:
-            result = {"clusters": {}, "clusterGroupApps": {}}
-            files = Path(self.path).glob("**/*.yaml")
-            for file in files:
-                if os.path.basename(file) == "Chart.yaml":
-                    continue
-                if os.path.basename(os.path.dirname(file)) == "templates":
-                    continue
-
-                try:
-                    with open(file, "r") as f:
-                        try:
-                            data = yaml.safe_load(f)
-                        except yaml.YAMLError as exc:
-                            print(
-                                f"Failed to parse '{file}' as yaml: {exc}",
-                                file=sys.stderr,
-                            )
-                            raise
-                        result = deep_merge(result, data)
-                except IOError as exc:
-                    print(f"Failed to open '{file}': {exc}", file=sys.stderr)
-                    raise
-            self._config = result
+            pass
+
+        with PROFILER.phase("instance.config"):
+            files = self.config_files()
+            if not self.snapshot_dir:
+                self._config = self._load_config(files)
+                return self._config
+
+            signature = self._snapshot_signature(files)
+            with PROFILER.phase("instance.config.snapshot"):
+                self._config = self._load_snapshot(signature)
+            if self._config is None:
+                self._config = self._load_config(files)
+                self._save_snapshot(signature, self._config)
             return self._config
 
+    def config_files(self) -> list:
+        """
+        Returns the sorted list of configuration files of the instance.
+        """
+        result = []
+        for file in Path(self.path).glob("**/*.yaml"):
+            if self.is_config_file(str(file)):
+                result.append(str(file))
+        # sort the files so the merge order does not depend on the filesystem
+        return sorted(result)
+
+    def is_config_file(self, path: str) -> bool:
+        """
+        Returns True if the given path is (or would be, if it existed) a configuration file of the instance.
+
+        Parameters
+        ----------
+        path : str
+            the path to check
+        """
+        relpath = os.path.relpath(os.path.realpath(path), os.path.realpath(self.path))
+        if relpath.startswith(os.pardir + os.sep) or not relpath.endswith(".yaml"):
+            return False
+        if os.path.basename(relpath) == "Chart.yaml":
+            return False
+        if os.path.basename(os.path.dirname(relpath)) == "templates":
+            return False
+        return True
+
+    def _load_config(self, files: list) -> dict:
+        """
+        Parses the given configuration files and returns the merged configuration.
+
+        Parameters
+        ----------
+        files : list
+            the configuration files to merge, ordered from lowest to highest priority
+        """
+        loader, _ = yaml_backend(self.yaml_backend)
+        result = {"clusters": {}, "clusterGroupApps": {}}
+        for file in files:
+            try:
+                with open(file, "r") as f, PROFILER.phase("instance.config.parse"):
+                    try:
+                        data = yaml.load(f, Loader=loader)
+                    except yaml.YAMLError as exc:
+                        print(
+                            f"Failed to parse '{file}' as yaml: {exc}",
+                            file=sys.stderr,
+                        )
+                        raise
+                    # empty files do not contain any configuration
+                    if data is not None:
+                        deep_merge_into(result, data)
+            except IOError as exc:
+                print(f"Failed to open '{file}': {exc}", file=sys.stderr)
+                raise
+        return result
+
+    @property
+    def snapshot_path(self) -> Union[str, None]:
+        if not self.snapshot_dir:
+            return None
+        # instances with the same name can exist in different checkouts
+        instance_id = hashlib.sha256(
+            os.path.abspath(self.path).encode("UTF-8")
+        ).hexdigest()[:16]
+        return os.path.join(self.snapshot_dir, f"{self.name}-{instance_id}.pickle")
+
+    def _snapshot_signature(self, files: list) -> list:
+        """
+        Returns the signature of the given configuration files, consisting of the path, modification time
+        and size of each file. A snapshot is only valid for the signature it was created with.
+
+        Parameters
+        ----------
+        files : list
+            the configuration files of the instance
+        """
+        signature = []
+        for file in files:
+            stat = os.stat(file)
+            signature.append((file, stat.st_mtime_ns, stat.st_size))
+        return signature
+
+    def _load_snapshot(self, signature: list) -> Union[dict, None]:
+        """
+        Returns the configuration stored in the snapshot or None if there is no valid snapshot for the
+        given signature.
+
+        Parameters
+        ----------
+        signature : list
+            the signature of the current configuration files
+        """
+        try:
+            with open(self.snapshot_path, "rb") as f:
+                snapshot = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as exc:
+            # a truncated or corrupt snapshot (or one referring to renamed classes) can fail in
+            # many ways, it is simply rebuilt
+            if self.debug:
+                print(
+                    f"Ignoring config snapshot '{self.snapshot_path}': {exc!r}",
+                    file=sys.stderr,
+                )
+            return None
+
+        if (
+            not isinstance(snapshot, dict)
+            or snapshot.get("version") != self.SNAPSHOT_VERSION
+            or snapshot.get("signature") != signature
+        ):
+            return None
+        return snapshot["config"]
+
+    def _save_snapshot(self, signature: list, config: dict) -> None:
+        """
+        Stores the given configuration as snapshot. Failing to write the snapshot is not an error,
+        the configuration is simply parsed again the next time.
+
+        Parameters
+        ----------
+        signature : list
+            the signature of the configuration files the configuration has been loaded from
+        config : dict
+            the merged configuration
+        """
+        snapshot = {
+            "version": self.SNAPSHOT_VERSION,
+            "signature": signature,
+            "config": config,
+        }
+        try:
+            os.makedirs(self.snapshot_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.snapshot_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError as exc:
+            print(
+                f"Failed to write config snapshot '{self.snapshot_path}': {exc}",
+                file=sys.stderr,
+            )
+
     @property
     def clusters(self) -> dict:
         # lazy loading, only create the cluster objects when someone tries to access
@@ -929,6 +1838,883 @@ class Instance(ConfigModel):
         return result
 
 
+class RenderJob:
+    """
+    A RenderJob represents the rendering of a single application on a single cluster. It collects
+    everything needed to execute the render command, so the actual execution can happen
+    independently of the config objects (e.g. in a worker thread).
+
+    Attributes
+    ----------
+    instance : Instance
+        the instance the cluster belongs to
+    cluster : Cluster
+        the cluster for which the application is rendered
+    app : Application
+        the application to render
+    key : str
+        the identifier of the job as used in the execution results ("<cluster> <app>")
+    release : str
+        the release name used when rendering the application
+    value_paths : list
+        the ordered list of value files passed to helm
+    values : dict
+        the argocd metadata passed to helm as explicit values
+    """
+
+    def __init__(self, instance: Instance, cluster: Cluster, appname: str) -> None:
+        """
+        Parameters
+        ----------
+        instance : Instance
+            the instance the cluster belongs to
+        cluster : Cluster
+            the cluster for which the application is rendered
+        appname : str
+            the name of the application to render
+        """
+        self.instance = instance
+        self.cluster = cluster
+        self.appname = appname
+        self.app = cluster.applications[appname]
+
+    @property
+    def key(self) -> str:
+        return f"{self.cluster.name} {self.appname}"
+
+    @property
+    def release(self) -> str:
+        return f"{self.app.name}-{self.cluster.name}"
+
+    @property
+    def value_paths(self) -> list:
+        # lazy loading, only resolve the value files for jobs that are actually rendered
+        try:
+            return self._value_paths
+        except AttributeError:
+            self._value_paths = self.cluster.app_values_file_paths(self.appname)
+            return self._value_paths
+
+    @property
+    def values(self) -> dict:
+        # pass argocd metadata as explicit values to helm
+        #
+        # the template rendering the ArgoCD application resource
+        # adds the same values as parameters to each app when
+        # rendering the resource
+        return {
+            "argocdParams.clusterName": self.cluster.name,
+            "argocdParams.clusterAPI": self.cluster.api,
+            "argocdParams.argocdStage": self.instance.name,
+        }
+
+    def template(
+        self,
+        helm: "Helm",
+        show_only: list = [],
+        stream: bool = False,
+        stats: dict = None,
+    ) -> Union[tuple, None]:
+        """
+        Renders the application with the given Helm object and returns the (stdout, stderr, returncode)
+        tuple of the helm call or None if the application does not exist.
+
+        Parameters
+        ----------
+        helm : Helm
+            the Helm object used to render the application
+        show_only : list, optional
+            list of templates that should be rendered
+        stream : bool, optional
+            if True, stdout is returned as a binary file object instead of a string (see
+            Helm.template_stream()); the default is False
+        stats : dict, optional
+            dict updated with details about the helm call (see Helm.template())
+        """
+        # trying to render a non existing app would cause a helm error,
+        # so it is up to the caller to report the missing app
+        if not self.app.exists:
+            return None
+        template = helm.template_stream if stream else helm.template
+        return template(
+            self.release,
+            self.app.namespace,
+            self.app.path,
+            self.value_paths,
+            self.values,
+            show_only,
+            stats,
+        )
+
+    def inputs_digest(
+        self, show_only: list = [], chart_digests: dict = None
+    ) -> Union[str, None]:
+        """
+        Returns a hash over all inputs of the render: the contents of the chart, of its local (file://)
+        dependencies and of the value files and the parameters of the helm call. The paths of the chart and the value files are not part of the
+        hash, so jobs in different checkouts with the same inputs have the same hash. Returns None if the
+        application does not exist.
+
+        Parameters
+        ----------
+        show_only : list, optional
+            list of templates that should be rendered
+        chart_digests : dict, optional
+            dict used to memoize the hashes of the chart directories (chart path -> hash)
+        """
+        if not self.app.exists:
+            return None
+
+        if chart_digests is None:
+            chart_digests = {}
+        chart = self.app.path
+        if chart not in chart_digests:
+            digest = hashlib.sha256(directory_digest(chart).encode("UTF-8"))
+            # local dependencies are packaged into the chart by helm, so they are inputs as well
+            for dependency in chart_dependencies(chart):
+                repository = str(dependency.get("repository", ""))
+                if repository.startswith("file://"):
+                    path = os.path.join(chart, repository[len("file://") :])
+                    digest.update(f"\0{repository}\0".encode("UTF-8"))
+                    digest.update(directory_digest(path).encode("UTF-8"))
+            chart_digests[chart] = digest.hexdigest()
+
+        inputs = {
+            "release": self.release,
+            "namespace": self.app.namespace,
+            "chart": chart_digests[chart],
+            "value_files": [file_digest(p).hexdigest() for p in self.value_paths],
+            "values": self.values,
+            "show_only": list(show_only or []),
+        }
+        return hashlib.sha256(
+            json.dumps(inputs, sort_keys=True).encode("UTF-8")
+        ).hexdigest()
+
+
+def select_jobs(
+    instance: Instance, cluster_regex: str = ".*", app_regex: str = ".*"
+) -> list:
+    """
+    Returns a RenderJob for each application matching the application regex on each cluster matching the
+    cluster regex, in cluster/application order.
+
+    Parameters
+    ----------
+    instance : Instance
+        the Instance object for which the jobs should be created
+    cluster_regex : str, optional
+        the regex used to select which clusters to operate on; the default '.*'
+    app_regex : str, optional
+        the regex used to select which applications on each cluster to operate on;
+        the default is '.*'
+    """
+    render_jobs = []
+    for clustername, cluster in instance.select_clusters(cluster_regex).items():
+        applications = cluster.select_applications(app_regex)
+        for appname in applications.keys():
+            render_jobs.append(RenderJob(instance, cluster, appname))
+    return render_jobs
+
+
+class DependencyIndex:
+    """
+    The DependencyIndex class is a reverse index from files to the render jobs consuming them. It
+    answers which renders are affected by a change of a given file.
+
+    A job consumes:
+    * all files below its chart directory and below the directories of local (file://) chart
+      dependencies
+    * its value files; optionally including the value files that do not exist but would be used if
+      they did, as creating (or deleting) them changes the render as well
+    * the configuration files of its instance, as they define clusters, groups and applications
+
+    Attributes
+    ----------
+    candidates : bool
+        whether value files that do not exist are indexed as well
+    """
+
+    def __init__(self, candidates: bool = True) -> None:
+        """
+        Parameters
+        ----------
+        candidates : bool, optional
+            whether value files that do not exist are indexed as well; the default is True
+        """
+        self.candidates = candidates
+        self._files = {}
+        self._dirs = {}
+        self._instances = {}
+
+    def add(self, job: RenderJob) -> None:
+        """
+        Adds the inputs of the given job to the index.
+
+        Parameters
+        ----------
+        job : RenderJob
+            the job to add
+        """
+        value_paths = job.cluster.app_values_file_paths(
+            job.appname, not self.candidates
+        )
+        # paths are resolved, so they match no matter if they are given through a symlinked directory
+        # or not (e.g. git reports the real path of the repository)
+        for path in value_paths:
+            self._files.setdefault(os.path.realpath(path), []).append(job)
+
+        chart = os.path.realpath(job.app.path)
+        self._dirs.setdefault(chart, []).append(job)
+        for dependency in chart_dependencies(chart):
+            repository = str(dependency.get("repository", ""))
+            if repository.startswith("file://"):
+                path = os.path.join(chart, repository[len("file://") :])
+                self._dirs.setdefault(os.path.realpath(path), []).append(job)
+
+        instance_path = os.path.realpath(job.instance.path)
+        self._instances.setdefault(instance_path, (job.instance, []))[1].append(job)
+
+    def consumers(self, path: str) -> list:
+        """
+        Returns the jobs consuming the given file, in the order they have been added.
+
+        Parameters
+        ----------
+        path : str
+            the path of the file
+        """
+        path = os.path.realpath(path)
+        result = list(self._files.get(path, []))
+
+        parent = os.path.dirname(path)
+        while True:
+            result.extend(self._dirs.get(parent, []))
+            if os.path.dirname(parent) == parent:
+                break
+            parent = os.path.dirname(parent)
+
+        for instance, jobs in self._instances.values():
+            if instance.is_config_file(path):
+                result.extend(jobs)
+
+        # a job can consume a file in multiple ways
+        unique = {id(job): job for job in result}
+        return list(unique.values())
+
+
+class WorkerPool:
+    """
+    The WorkerPool class executes work items on a bounded number of worker threads. The
+    actual work (helm/git calls) happens in subprocesses, so threads are sufficient to keep
+    all cores busy.
+
+    Results are always returned in the order the work items were submitted, independent of
+    the order in which they finish, which keeps the output of parallel runs deterministic.
+
+    Attributes
+    ----------
+    jobs : int
+        the maximum number of work items executed in parallel; with 1 (the default) all
+        work items are executed sequentially in the calling thread
+    """
+
+    def __init__(self, jobs: int = 1) -> None:
+        """
+        Parameters
+        ----------
+        jobs : int, optional
+            the maximum number of work items executed in parallel
+        """
+        self.jobs = max(1, jobs)
+        self._executor = None
+
+    def map_ordered(self, func, items: list):
+        """
+        Generator that applies func to each item and yields (item, result) tuples in the order of
+        the provided items.
+
+        Closing the generator before it is exhausted (e.g. by returning from the consuming
+        loop) cancels all work items that have not been started yet.
+
+        Parameters
+        ----------
+        func : callable
+            the function called with each item
+        items : list
+            the work items
+        """
+        if self.jobs == 1:
+            for item in items:
+                yield item, func(item)
+            return
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.jobs)
+
+        futures = [self._executor.submit(func, item) for item in items]
+        try:
+            for item, future in zip(items, futures):
+                yield item, future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def close(self) -> None:
+        """
+        Shuts down the worker threads, cancelling all work items that have not been started yet.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+class RenderCache:
+    """
+    The RenderCache class is a persistent, content-addressed on-disk cache for the results of
+    "helm template" calls.
+
+    The cache key is a hash over everything influencing the rendered documents: the contents of the chart
+    directory, the ordered list of value files and their contents, all other parameters of the helm call
+    (global parameters like --debug, release, namespace, --set values, --show-only templates) and the helm
+    version. The paths of the chart and the value files are not part of the key, so identical inputs in
+    different checkouts share entries.
+
+    Only successful renders are stored, failed ones might be caused by transient problems (e.g. when
+    pulling chart dependencies) and are always executed again.
+
+    Each entry consists of a metadata file (<key>.json) holding stderr and the exit code and a file
+    holding the raw stdout (<key>.out). The stdout is streamed from and to the entry files, so the size
+    of the rendered documents does not affect the memory usage.
+
+    Attributes
+    ----------
+    path : str
+        the directory containing the cache entries
+    max_age : float
+        entries that have not been used for max_age seconds are evicted
+    max_size : int
+        if the total size of all entries exceeds max_size bytes, the least recently used entries are evicted
+    hits : int
+        the number of cache hits since the cache object was created
+    misses : int
+        the number of cache misses since the cache object was created
+    """
+
+    # bump whenever the parameters covered by the key change
+    KEY_VERSION = 2
+
+    def __init__(
+        self,
+        path: str,
+        max_age: float = 7 * 24 * 3600,
+        max_size: int = 1024 * 1024 * 1024,
+    ) -> None:
+        """
+        Parameters
+        ----------
+        path : str
+            the directory containing the cache entries; it is created if it does not exist
+        max_age : float, optional
+            the maximum time in seconds an unused entry is kept; the default is 7 days
+        max_size : int, optional
+            the maximum total size of all entries in bytes; the default is 1 GiB
+        """
+        self.path = path
+        self.max_age = max_age
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._chart_digests = {}
+        self._lock = threading.Lock()
+        os.makedirs(self.path, exist_ok=True)
+
+    def key(self, command: list, chart: str, value_files: list, version: str) -> str:
+        """
+        Returns the cache key for the given helm command.
+
+        Parameters
+        ----------
+        command : list
+            the parameters helm is called with, including the global parameters
+        chart : str
+            the path to the helm chart referenced in the command
+        value_files : list
+            the value files referenced in the command
+        version : str
+            the version of the helm binary
+        """
+        with PROFILER.phase("cache.key"):
+            return self._key(command, chart, value_files, version)
+
+    def _key(self, command: list, chart: str, value_files: list, version: str) -> str:
+        value_files = set(value_files)
+        digest = hashlib.sha256()
+        digest.update(f"{self.KEY_VERSION}\0helm {version}\0".encode("UTF-8"))
+        for param in command:
+            # replace the chart and value file paths by a hash of their contents
+            if param == chart:
+                param = "chart:" + self._chart_digest(chart)
+            elif param in value_files:
+                param = "file:" + file_digest(param).hexdigest()
+            digest.update(param.encode("UTF-8") + b"\0")
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Union[tuple, None]:
+        """
+        Returns the (stdout, stderr, returncode) tuple stored for the given key or None if there is
+        no entry for the key. stdout is a binary file object reading the stored documents, the caller
+        has to close it.
+
+        Parameters
+        ----------
+        key : str
+            the cache key
+        """
+        meta_path, out_path = self._entry_paths(key)
+        try:
+            with open(meta_path, "r") as f:
+                meta = json.load(f)
+            stdout = open(out_path, "rb")
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        # mark the entry as recently used for the size based eviction
+        with contextlib.suppress(OSError):
+            os.utime(meta_path)
+            os.utime(out_path)
+        with self._lock:
+            self.hits += 1
+        return stdout, meta["stderr"], meta["returncode"]
+
+    def put(self, key: str, stdout: BinaryIO, stderr: str, returncode: int) -> None:
+        """
+        Stores the result of a helm call. Results with a non-zero exit code are ignored.
+
+        Parameters
+        ----------
+        key : str
+            the cache key
+        stdout : BinaryIO
+            a seekable binary file object holding the stdout of the helm call; it is read from the start
+            and rewound afterwards
+        stderr : str
+            the stderr of the helm call
+        returncode : int
+            the exit code of the helm call
+        """
+        if returncode != 0:
+            return
+
+        meta_path, out_path = self._entry_paths(key)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        # the stdout file is written first, an entry only exists once its metadata file exists
+        stdout.seek(0)
+        self._write_atomic(out_path, stdout)
+        stdout.seek(0)
+        self._write_atomic(
+            meta_path,
+            json.dumps({"stderr": stderr, "returncode": returncode}).encode("UTF-8"),
+        )
+
+    def evict(self) -> None:
+        """
+        Removes all entries that have not been used for more than max_age seconds and afterwards
+        the least recently used entries until the total size is below max_size.
+        """
+        now = time.time()
+        entries = []
+        for dirpath, _, filenames in os.walk(self.path):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if now - stat.st_mtime > self.max_age:
+                    with contextlib.suppress(OSError):
+                        os.remove(path)
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            with contextlib.suppress(OSError):
+                os.remove(path)
+            total -= size
+
+    def _chart_digest(self, chart: str) -> str:
+        # the chart is hashed once per cache object, charts do not change during a render run
+        try:
+            return self._chart_digests[chart]
+        except KeyError:
+            self._chart_digests[chart] = directory_digest(chart)
+            return self._chart_digests[chart]
+
+    def _entry_paths(self, key: str) -> tuple:
+        directory = os.path.join(self.path, key[:2])
+        return (
+            os.path.join(directory, f"{key}.json"),
+            os.path.join(directory, f"{key}.out"),
+        )
+
+    def _write_atomic(self, path: str, data: Union[bytes, BinaryIO]) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                if isinstance(data, bytes):
+                    f.write(data)
+                else:
+                    shutil.copyfileobj(data, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+            raise
+
+
+class DependencyCache:
+    """
+    The DependencyCache class is a persistent, content-addressed on-disk cache for the chart archives
+    "helm dependency build" stores in the charts/ directory of a chart.
+
+    The cache key is a hash over everything determining the built dependencies: the dependencies
+    declared in Chart.yaml (or requirements.yaml), the lock file, the contents of local (file://)
+    dependencies and the helm version. Charts with the same dependencies share an entry and the entries
+    survive the cleanup of the working tree, so dependencies are only built again when they change.
+
+    Each entry is a directory holding the chart archives and the lock file created by the build.
+
+    Attributes
+    ----------
+    path : str
+        the directory containing the cache entries
+    max_age : float
+        entries that have not been used for max_age seconds are evicted
+    hits : int
+        the number of cache hits since the cache object was created
+    misses : int
+        the number of cache misses since the cache object was created
+    """
+
+    LOCK_FILES = ("Chart.lock", "requirements.lock")
+
+    def __init__(self, path: str, max_age: float = 7 * 24 * 3600) -> None:
+        """
+        Parameters
+        ----------
+        path : str
+            the directory containing the cache entries; it is created if it does not exist
+        max_age : float, optional
+            the maximum time in seconds an unused entry is kept; the default is 7 days
+        """
+        self.path = path
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.path, exist_ok=True)
+
+    def key(self, chart: str, version: str) -> str:
+        """
+        Returns the cache key for the dependencies of the given chart.
+
+        Parameters
+        ----------
+        chart : str
+            the path to the helm chart
+        version : str
+            the version of the helm binary
+        """
+        dependencies = chart_dependencies(chart)
+        digest = hashlib.sha256()
+        digest.update(f"helm {version}\0".encode("UTF-8"))
+        digest.update(json.dumps(dependencies, sort_keys=True).encode("UTF-8"))
+        for filename in self.LOCK_FILES:
+            path = os.path.join(chart, filename)
+            if os.path.isfile(path):
+                digest.update(f"\0{filename}\0".encode("UTF-8"))
+                file_digest(path, digest)
+        for dependency in dependencies:
+            repository = str(dependency.get("repository", ""))
+            if repository.startswith("file://"):
+                path = os.path.join(chart, repository[len("file://") :])
+                digest.update(f"\0{repository}\0".encode("UTF-8"))
+                digest.update(directory_digest(path).encode("UTF-8"))
+        return digest.hexdigest()
+
+    def restore(self, key: str, chart: str) -> bool:
+        """
+        Copies the chart archives (and the lock file, if the chart has none) of the given entry into the
+        chart. Returns False if there is no entry for the key.
+
+        Parameters
+        ----------
+        key : str
+            the cache key
+        chart : str
+            the path to the helm chart
+        """
+        entry = os.path.join(self.path, key)
+        try:
+            filenames = os.listdir(entry)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return False
+
+        os.makedirs(os.path.join(chart, "charts"), exist_ok=True)
+        for filename in filenames:
+            if filename in self.LOCK_FILES:
+                target = os.path.join(chart, filename)
+                if os.path.exists(target):
+                    continue
+            else:
+                target = os.path.join(chart, "charts", filename)
+            shutil.copy2(os.path.join(entry, filename), target)
+
+        # mark the entry as recently used for the age based eviction
+        with contextlib.suppress(OSError):
+            os.utime(entry)
+        with self._lock:
+            self.hits += 1
+        return True
+
+    def store(self, key: str, chart: str) -> None:
+        """
+        Stores the chart archives in the charts/ directory and the lock file of the given chart.
+
+        Parameters
+        ----------
+        key : str
+            the cache key
+        chart : str
+            the path to the helm chart
+        """
+        entry = os.path.join(self.path, key)
+        tmp_entry = tempfile.mkdtemp(dir=self.path, suffix=".tmp")
+        try:
+            charts = os.path.join(chart, "charts")
+            with contextlib.suppress(FileNotFoundError):
+                for filename in os.listdir(charts):
+                    if filename.endswith(".tgz"):
+                        shutil.copy2(os.path.join(charts, filename), tmp_entry)
+            for filename in self.LOCK_FILES:
+                path = os.path.join(chart, filename)
+                if os.path.isfile(path):
+                    shutil.copy2(path, tmp_entry)
+            # entries are immutable, an entry stored by a concurrent run is just as good
+            os.rename(tmp_entry, entry)
+        except OSError:
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+
+    def evict(self) -> None:
+        """
+        Removes all entries that have not been used for more than max_age seconds.
+        """
+        now = time.time()
+        for filename in os.listdir(self.path):
+            entry = os.path.join(self.path, filename)
+            with contextlib.suppress(OSError):
+                if now - os.stat(entry).st_mtime > self.max_age:
+                    shutil.rmtree(entry)
+
+
+class ChartArtifacts:
+    """
+    The ChartArtifacts class tracks the files a render creates in the chart directories (the chart
+    archives in charts/, the lock files and the temporary tmpcharts/ directory of
+    "helm dependency build") and removes exactly those again, so rendering leaves the working tree as
+    it was. Files that existed before the render, like dependencies built by hand, are kept.
+
+    Attributes
+    ----------
+    charts : dict
+        the state of each tracked chart before it was first modified (chart path -> state)
+    """
+
+    TEMPORARY_DIRS = ("tmpcharts",)
+
+    def __init__(self) -> None:
+        self.charts = {}
+        self._lock = threading.Lock()
+
+    def track(self, chart: str) -> None:
+        """
+        Records the state of the given chart before its dependencies are modified; only the first call
+        for a chart has an effect.
+
+        Parameters
+        ----------
+        chart : str
+            the path to the helm chart
+        """
+        with self._lock:
+            if chart in self.charts:
+                return
+            self.charts[chart] = None
+
+        try:
+            archives = set(os.listdir(os.path.join(chart, "charts")))
+        except FileNotFoundError:
+            archives = None
+        lock_files = {}
+        for filename in DependencyCache.LOCK_FILES:
+            try:
+                with open(os.path.join(chart, filename), "rb") as f:
+                    lock_files[filename] = f.read()
+            except FileNotFoundError:
+                lock_files[filename] = None
+        directories = {
+            dirname: os.path.exists(os.path.join(chart, dirname))
+            for dirname in self.TEMPORARY_DIRS
+        }
+        with self._lock:
+            self.charts[chart] = (archives, lock_files, directories)
+
+    def cleanup(self) -> None:
+        """
+        Removes the files created in the tracked charts and restores their lock files.
+        """
+        with self._lock:
+            charts = self.charts
+            self.charts = {}
+
+        for chart, state in charts.items():
+            if state is None:
+                continue
+            archives, lock_files, directories = state
+
+            charts_dir = os.path.join(chart, "charts")
+            with contextlib.suppress(FileNotFoundError):
+                for filename in os.listdir(charts_dir):
+                    if archives is None or filename not in archives:
+                        self._remove(os.path.join(charts_dir, filename))
+            if archives is None:
+                with contextlib.suppress(OSError):
+                    os.rmdir(charts_dir)
+
+            for filename, content in lock_files.items():
+                path = os.path.join(chart, filename)
+                if content is None:
+                    with contextlib.suppress(FileNotFoundError):
+                        os.remove(path)
+                    continue
+                with contextlib.suppress(FileNotFoundError):
+                    with open(path, "rb") as f:
+                        if f.read() == content:
+                            continue
+                with open(path, "wb") as f:
+                    f.write(content)
+
+            for dirname, existed in directories.items():
+                if not existed:
+                    self._remove(os.path.join(chart, dirname))
+
+    def _remove(self, path: str) -> None:
+        """
+        Removes the given file or directory tree, if it exists.
+
+        Parameters
+        ----------
+        path : str
+            the path to remove
+        """
+        if os.path.isdir(path) and not os.path.islink(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+
+
+class ProcessRunner:
+    """
+    The ProcessRunner class executes the git and helm commands, each in the calling thread.
+
+    A command exceeding its timeout is killed and reported with the return code TIMEOUT. Closing the
+    runner kills all running commands and makes further commands fail immediately, e.g. to stop the
+    remaining helm calls of a render after a fatal error. Each command runs in its own process group,
+    so killing it also kills its child processes (e.g. helm plugins and post-renderers), which would
+    otherwise keep the output pipes open.
+    """
+
+    TIMEOUT = 124
+
+    def __init__(self) -> None:
+        self._processes = set()
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def run(
+        self, command: list, stdout: BinaryIO = None, timeout: float = None
+    ) -> subprocess.CompletedProcess:
+        """
+        Executes the given command and returns the result; stdout and stderr are captured as bytes.
+
+        Parameters
+        ----------
+        command : list
+            the command and its parameters
+        stdout : BinaryIO, optional
+            a binary file object (with a file descriptor) the command writes its stdout to instead of
+            capturing it; the default is to capture stdout
+        timeout : float, optional
+            the maximum time in seconds the command may run; the default is no limit
+        """
+        process = subprocess.Popen(
+            command,
+            stdout=stdout if stdout is not None else subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            start_new_session=True,
+        )
+        with process:
+            with self._lock:
+                if self._closed:
+                    self._kill(process)
+                self._processes.add(process)
+            try:
+                output, errors = process.communicate(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                self._kill(process)
+                output, errors = process.communicate()
+                return self._timed_out(command, timeout, output, errors)
+            except BaseException:
+                self._kill(process)
+                raise
+            finally:
+                with self._lock:
+                    self._processes.discard(process)
+        return subprocess.CompletedProcess(command, process.returncode, output, errors)
+
+    def close(self) -> None:
+        """
+        Kills all running commands, commands started afterwards are killed right away.
+        """
+        with self._lock:
+            self._closed = True
+            processes = list(self._processes)
+        for process in processes:
+            self._kill(process)
+
+    def _kill(self, process) -> None:
+        with contextlib.suppress(ProcessLookupError):
+            os.killpg(process.pid, signal.SIGKILL)
+
+    def _timed_out(
+        self, command: list, timeout: float, output: bytes, errors: bytes
+    ) -> subprocess.CompletedProcess:
+        message = (
+            f"Error: {os.path.basename(command[0])} timed out after {timeout:g}s\n"
+        )
+        return subprocess.CompletedProcess(
+            command, self.TIMEOUT, output, (errors or b"") + message.encode("UTF-8")
+        )
+
+
 class GitCLI:
     """
     The GitCLI class is the interface to the git cli and wraps the actual execution of git commands.
@@ -940,11 +2726,16 @@ class GitCLI:
     ----------
     git : str
         the git binary to use
+    runner : ProcessRunner
+        executes the git commands
     """
 
-    def __init__(self, git: str = "git", debug: bool = False):
+    def __init__(
+        self, git: str = "git", debug: bool = False, runner: ProcessRunner = None
+    ):
         self.git = git
         self.debug = debug
+        self.runner = runner if runner is not None else ProcessRunner()
 
     def clean(self, params: list = ["-n"]) -> bool:
         """
@@ -968,6 +2759,103 @@ class GitCLI:
         """
         return self.clean(["-d", "-X", "-f"])
 
+    def toplevel(self, path: str = ".") -> Union[str, None]:
+        """
+        Returns the top-level directory of the working tree containing the given path or None if the
+        path is not part of a git working tree.
+
+        Parameters
+        ----------
+        path : str, optional
+            a path inside the working tree
+        """
+        stdout, stderr, code = self._execute(
+            ["-C", path, "rev-parse", "--show-toplevel"]
+        )
+        if code != 0:
+            print(stderr, file=sys.stderr)
+            return None
+        return stdout.strip()
+
+    def changed_files(self, ref: str, repo: str = ".") -> Union[list, None]:
+        """
+        Returns the absolute paths of all files that changed since the given ref forked off the current
+        HEAD, including uncommitted changes and untracked files. Returns None if git fails.
+
+        Parameters
+        ----------
+        ref : str
+            the git ref (branch, tag, commit...) to compare against
+        repo : str, optional
+            a path inside the repository
+        """
+        toplevel = self.toplevel(repo)
+        if toplevel is None:
+            return None
+
+        # compare against the merge base, so changes on ref itself are not reported
+        stdout, stderr, code = self._execute(
+            ["-C", toplevel, "merge-base", ref, "HEAD"]
+        )
+        if code != 0:
+            print(stderr, file=sys.stderr)
+            return None
+        base = stdout.strip()
+
+        result = []
+        for params in (
+            ["diff", "--name-only", "--no-renames", base],
+            ["ls-files", "--others", "--exclude-standard"],
+        ):
+            stdout, stderr, code = self._execute(["-C", toplevel] + params)
+            if code != 0:
+                print(stderr, file=sys.stderr)
+                return None
+            result.extend(
+                os.path.join(toplevel, line) for line in stdout.splitlines() if line
+            )
+        return result
+
+    def worktree_add(self, path: str, ref: str, repo: str = ".") -> bool:
+        """
+        Checks out the given ref into a new detached worktree, without touching the current working tree.
+
+        Parameters
+        ----------
+        path : str
+            the directory of the new worktree
+        ref : str
+            the git ref (branch, tag, commit...) to check out
+        repo : str, optional
+            a path inside the repository the worktree is added to
+        """
+        _, stderr, code = self._execute(
+            ["-C", repo, "worktree", "add", "--detach", path, ref]
+        )
+        if code != 0:
+            print(stderr, file=sys.stderr)
+            return False
+        return True
+
+    def worktree_remove(self, path: str, repo: str = ".") -> bool:
+        """
+        Removes a worktree, including all untracked and modified files in it.
+
+        Parameters
+        ----------
+        path : str
+            the directory of the worktree
+        repo : str, optional
+            a path inside the repository the worktree belongs to
+        """
+        _, stderr, code = self._execute(
+            ["-C", repo, "worktree", "remove", "--force", path]
+        )
+        if code != 0:
+            print(stderr, file=sys.stderr)
+            return False
+        return True
+
     def _execute(self, params: list) -> tuple:
         """
         Executes an arbitrary git command.
@@ -983,9 +2871,9 @@ class GitCLI:
         if self.debug:
             print("Executing git command: %s" % " ".join(command), file=sys.stderr)
 
-        command_result = subprocess.run(
-            command, stdout=subprocess.PIPE, stderr=subprocess.PIPE
-        )
+        PROFILER.count("subprocess.spawn")
+        with PROFILER.phase("subprocess.git"):
+            command_result = self.runner.run(command)
 
         stdout = ""
         stderr = ""
@@ -1013,9 +2901,30 @@ class Helm:
         the helm binary to use
     debug : bool
         whether to execute the helm commands in debug mode (i.e. with --debug)
+    cache : RenderCache|None
+        the cache used for the results of "helm template"; None disables caching
+    dependency_cache : DependencyCache|None
+        the cache used for the chart dependencies; None disables caching
+    artifacts : ChartArtifacts|None
+        tracks the files created by preparing the dependencies of a chart; None disables tracking
+    runner : ProcessRunner
+        executes the helm commands
+    timeout : float|None
+        the maximum time in seconds a helm command may run; None means no limit
+    dependency_times : dict
+        the time in seconds spent preparing the dependencies of each chart (chart path -> seconds)
     """
 
-    def __init__(self, helm: str = "helm", debug: bool = False):
+    def __init__(
+        self,
+        helm: str = "helm",
+        debug: bool = False,
+        cache: RenderCache = None,
+        dependency_cache: DependencyCache = None,
+        artifacts: ChartArtifacts = None,
+        runner: ProcessRunner = None,
+        timeout: float = None,
+    ):
         """
         Parameters
         ----------
@@ -1023,9 +2932,31 @@ class Helm:
             the helm binary to use
         debug : bool, optional
             whether to execute the helm commands in debug mode (i.e. with --debug)
+        cache : RenderCache, optional
+            the cache used for the results of "helm template"; the default is not to cache anything
+        dependency_cache : DependencyCache, optional
+            the cache used for the chart dependencies; the default is to always build the dependencies
+        artifacts : ChartArtifacts, optional
+            tracks the files created by preparing the dependencies of a chart; the default is not to
+            track them
+        runner : ProcessRunner, optional
+            executes the helm commands; the default runs them with subprocess
+        timeout : float, optional
+            the maximum time in seconds a helm command may run; the default is no limit
         """
         self.helm = helm
         self.debug = debug
+        self.cache = cache
+        self.dependency_cache = dependency_cache
+        self.artifacts = artifacts
+        self.runner = runner if runner is not None else ProcessRunner()
+        self.timeout = timeout
+        # dependency builds modify the chart directory, so parallel template calls for the
+        # same chart must not build its dependencies at the same time
+        self._dependency_locks = {}
+        self._dependency_locks_lock = threading.Lock()
+        self._dependencies_built = set()
+        self.dependency_times = {}
 
     def template(
         self,
@@ -1035,9 +2966,11 @@ class Helm:
         value_files: list = [],
         values: dict = {},
         show_only: list = [],
+        stats: dict = None,
     ) -> tuple:
         """
-        Executes "helm template" for the given chart.
+        Executes "helm template" for the given chart and returns the (stdout, stderr, returncode) tuple.
+        The complete output is held in memory, use template_stream() for large charts.
 
         Parameters
         ----------
@@ -1057,6 +2990,33 @@ class Helm:
             string values will be passed with --set-string, everything else will be passed with --set
         show_only : list, optional
             list of templates that should be rendered
+        stats : dict, optional
+            dict updated with details about the call: "cache" is set to "hit" or "miss", or to None
+            if no cache is used
+        """
+        stdout, stderr, returncode = self.template_stream(
+            release, namespace, chart, value_files, values, show_only, stats
+        )
+        with stdout:
+            return stdout.read().decode("UTF-8"), stderr, returncode
+
+    def template_stream(
+        self,
+        release: str,
+        namespace: str,
+        chart: str,
+        value_files: list = [],
+        values: dict = {},
+        show_only: list = [],
+        stats: dict = None,
+    ) -> tuple:
+        """
+        Executes "helm template" for the given chart like template(), but returns stdout as a binary
+        file object positioned at the start of the rendered documents. helm writes directly into a
+        temporary file (or the documents are read from the cache), so the memory usage does not depend
+        on the size of the output. The caller has to close the file object.
+
+        The parameters are the same as for template().
         """
         command = ["template", release, chart, "-n", namespace]
         for f in value_files:
@@ -1095,14 +3055,78 @@ class Helm:
         if set_string_values:
             command = command + ["--set-string", ",".join(set_string_values)]
 
-        stdout, stderr, returncode = self._execute(command)
+        if stats is None:
+            stats = {}
+        stats["cache"] = None
+        if self.cache is None:
+            return self._template(command, chart)
+
+        # the global parameters change the output as well, e.g. --debug adds to stderr
+        key = self.cache.key(
+            self._global_params() + command, chart, value_files, self.version()
+        )
+        result = self.cache.get(key)
+        stats["cache"] = "miss" if result is None else "hit"
+        if result is not None:
+            if self.debug:
+                print(
+                    "Using cached result for helm command: %s" % " ".join(command),
+                    file=sys.stderr,
+                )
+            return result
+
+        stdout, stderr, returncode = self._template(command, chart)
+        # timed out or killed calls say nothing about the result of the next call
+        if returncode == ProcessRunner.TIMEOUT or returncode < 0:
+            return stdout, stderr, returncode
+        try:
+            self.cache.put(key, stdout, stderr, returncode)
+        except BaseException:
+            stdout.close()
+            raise
+        return stdout, stderr, returncode
+
+    def _template(self, command: list, chart: str) -> tuple:
+        """
+        Executes the given "helm template" command, building the dependencies of the chart if necessary.
+        stdout is returned as a binary file object.
+
+        Parameters
+        ----------
+        command : list
+            the parameters helm is called with
+        chart : str
+            the path to the helm chart that should be rendered
+        """
+        stdout, stderr, returncode = self._execute(command, tempfile.TemporaryFile())
         if self._is_missing_dependency_err(stderr):
-            stdout, stderr, returncode = self.dependency_build(chart)
+            stdout.close()
+            stdout, stderr, returncode = self.prepare_dependencies(chart)
             if returncode != 0:
-                return stdout, stderr, returncode
-            return self._execute(command)
+                return io.BytesIO(stdout.encode("UTF-8")), stderr, returncode
+            return self._execute(command, tempfile.TemporaryFile())
         return stdout, stderr, returncode
 
+    def _global_params(self) -> list:
+        """
+        Returns the global parameters passed to helm before the parameters of each command.
+        """
+        if self.debug:
+            return ["--debug"]
+        return []
+
+    def version(self) -> str:
+        """
+        Returns the version of the helm binary (as reported by "helm version --short").
+        """
+        # lazy loading, only call helm once per Helm object
+        try:
+            return self._version
+        except AttributeError:
+            stdout, _, _ = self._execute(["version", "--short"])
+            self._version = stdout.strip()
+            return self._version
+
     def dependency_build(self, chart: str) -> tuple:
         """
         Executes "helm dependency build" for the given chart.
@@ -1118,6 +3142,112 @@ class Helm:
         """
         return self._execute(["dependency", "build", chart])
 
+    def prepare_dependencies(self, chart: str) -> tuple:
+        """
+        Makes sure the dependencies of the given chart are available in its charts/ directory, either
+        by restoring them from the dependency cache or by executing "helm dependency build". The
+        dependencies of each chart are prepared only once per Helm object. Returns the
+        (stdout, stderr, returncode) tuple of the build (empty output if nothing had to be built).
+
+        Parameters
+        ----------
+        chart : str
+            the path to the helm chart for which the dependencies should be prepared
+        """
+        with self._dependency_lock(chart):
+            # another thread might have prepared the dependencies in the meantime
+            if chart in self._dependencies_built:
+                return "", "", 0
+
+            start = time.perf_counter()
+            try:
+                return self._prepare_dependencies(chart)
+            finally:
+                self.dependency_times[chart] = self.dependency_times.get(chart, 0.0) + (
+                    time.perf_counter() - start
+                )
+
+    def _prepare_dependencies(self, chart: str) -> tuple:
+        """
+        Restores or builds the dependencies of the given chart, see prepare_dependencies(). The caller
+        has to hold the dependency lock of the chart.
+
+        Parameters
+        ----------
+        chart : str
+            the path to the helm chart for which the dependencies should be prepared
+        """
+        if self.artifacts is not None:
+            self.artifacts.track(chart)
+
+        key = None
+        if self.dependency_cache is not None:
+            key = self.dependency_cache.key(chart, self.version())
+            if self.dependency_cache.restore(key, chart):
+                if self.debug:
+                    print(
+                        f"Using cached dependencies for chart: {chart}",
+                        file=sys.stderr,
+                    )
+                self._dependencies_built.add(chart)
+                return "", "", 0
+
+        stdout, stderr, returncode = self.dependency_build(chart)
+        if returncode != 0:
+            return stdout, stderr, returncode
+        self._dependencies_built.add(chart)
+        if key is not None:
+            self.dependency_cache.store(key, chart)
+        return stdout, stderr, returncode
+
+    def missing_dependencies(self, chart: str) -> list:
+        """
+        Returns the names of the dependencies declared by the given chart that are neither available
+        as archive (<name>-<version>.tgz) nor as unpacked chart in its charts/ directory. For a
+        dependency with a version range any archive of the dependency matches, a mismatch is still
+        detected by helm template.
+
+        Parameters
+        ----------
+        chart : str
+            the path to the helm chart to check
+        """
+        try:
+            available = os.listdir(os.path.join(chart, "charts"))
+        except OSError:
+            available = []
+
+        missing = []
+        for dependency in chart_dependencies(chart):
+            name = str(dependency.get("name", ""))
+            if name in available and os.path.isfile(
+                os.path.join(chart, "charts", name, "Chart.yaml")
+            ):
+                continue
+            version = str(dependency.get("version", ""))
+            if re.fullmatch(SEMVER, version):
+                if f"{name}-{version}.tgz" in available:
+                    continue
+            else:
+                # the name alone is not enough, "foo-bar-1.0.0.tgz" is not an archive of "foo"
+                archive = re.compile(r"%s-%s\.tgz" % (re.escape(name), SEMVER))
+                if any(archive.fullmatch(f) for f in available):
+                    continue
+            missing.append(name)
+        return missing
+
+    def _dependency_lock(self, chart: str) -> threading.Lock:
+        """
+        Returns the lock guarding dependency builds of the given chart.
+
+        Parameters
+        ----------
+        chart : str
+            the path to the helm chart
+        """
+        with self._dependency_locks_lock:
+            return self._dependency_locks.setdefault(chart, threading.Lock())
+
     # Taken straight from argocd:
     # https://github.com/argoproj/argo-cd/blob/a6c664b2aefc513936e9f56c1a373bdbddcd5727/util/helm/helm.go#L60
     def _is_missing_dependency_err(self, err: str) -> bool:
@@ -1133,7 +3263,7 @@ class Helm:
             "found in Chart.yaml, but missing in charts/ directory" in err
         )
 
-    def _execute(self, params: list) -> tuple:
+    def _execute(self, params: list, output: BinaryIO = None) -> tuple:
         """
         Executes an arbitrary helm command.
 
@@ -1141,21 +3271,31 @@ class Helm:
         ----------
         params : list
             list of parameters to call helm with
+        output : BinaryIO, optional
+            a binary file object (with a file descriptor) helm writes its stdout to; if provided,
+            the returned stdout is this file object, rewound to the start; the default is to return
+            stdout as a string
         """
-        base_cmd = [self.helm]
-        if self.debug:
-            base_cmd = base_cmd + ["--debug"]
+        base_cmd = [self.helm] + self._global_params()
 
         command = base_cmd + params
         if self.debug:
             print("Executing helm command: %s" % " ".join(command), file=sys.stderr)
 
-        command_result = subprocess.run(
-            command, stdout=subprocess.PIPE, stderr=subprocess.PIPE
-        )
+        PROFILER.count("subprocess.spawn")
+        try:
+            with PROFILER.phase(f"subprocess.helm {params[0]}"):
+                command_result = self.runner.run(command, output, self.timeout)
+        except BaseException:
+            if output is not None:
+                output.close()
+            raise
 
         stdout = ""
         stderr = ""
+        if output is not None:
+            output.seek(0)
+            stdout = output
         try:
             if command_result.stdout:
                 stdout = command_result.stdout.decode("UTF-8")
@@ -1170,19 +3310,353 @@ class Helm:
         return stdout, stderr, command_result.returncode
 
 
+class OutputSink:
+    """
+    An OutputSink receives the rendered documents of the applications in render order. The documents
+    are passed as binary file objects and copied in chunks, so the memory usage does not depend on the
+    size of the rendered documents. Only the documents of successful renders are passed to the sink,
+    failed renders are reported with skip().
+
+    This base class discards all documents, subclasses implement the actual output.
+    """
+
+    def write(self, job: RenderJob, documents: BinaryIO, size: int) -> None:
+        """
+        Writes the rendered documents of an application.
+
+        Parameters
+        ----------
+        job : RenderJob
+            the job that rendered the documents
+        documents : BinaryIO
+            a binary file object positioned at the start of the rendered documents
+        size : int
+            the size of the rendered documents in bytes; 0 if the application rendered no documents
+        """
+        pass
+
+    def skip(self, job: RenderJob) -> None:
+        """
+        Called instead of write() for an application whose render failed.
+
+        Parameters
+        ----------
+        job : RenderJob
+            the job that failed
+        """
+        pass
+
+    def close(self) -> None:
+        """
+        Finishes the output, e.g. by flushing and closing files.
+        """
+        pass
+
+
+class StdoutSink(OutputSink):
+    """
+    The StdoutSink writes the rendered documents of all applications to stdout, each followed by an
+    empty line.
+    """
+
+    def write(self, job: RenderJob, documents: BinaryIO, size: int) -> None:
+        if not size:
+            return
+        try:
+            # text written through sys.stdout must not end up behind the raw documents
+            sys.stdout.flush()
+            shutil.copyfileobj(documents, sys.stdout.buffer)
+            sys.stdout.buffer.write(b"\n")
+            sys.stdout.buffer.flush()
+        except BrokenPipeError:
+            # https://docs.python.org/3/library/signal.html#note-on-sigpipe
+            devnull = os.open(os.devnull, os.O_WRONLY)
+            os.dup2(devnull, sys.stdout.fileno())
+            sys.exit(1)
+
+
+class TarballSink(OutputSink):
+    """
+    The TarballSink writes the rendered documents of each application into a separate member
+    "<instance>/<cluster>/<app>.yaml" of a tar archive. The archive is compressed according to the
+    extension of its path (.tar.gz/.tgz, .tar.bz2 or .tar.xz).
+
+    Attributes
+    ----------
+    path : str
+        the path of the tar archive
+    """
+
+    COMPRESSIONS = {
+        ".tar.gz": "gz",
+        ".tgz": "gz",
+        ".tar.bz2": "bz2",
+        ".tar.xz": "xz",
+    }
+
+    def __init__(self, path: str) -> None:
+        """
+        Parameters
+        ----------
+        path : str
+            the path of the tar archive; an existing file is overwritten
+        """
+        self.path = path
+        mode = "w"
+        for extension, compression in self.COMPRESSIONS.items():
+            if path.endswith(extension):
+                mode = f"w:{compression}"
+                break
+        self._tar = tarfile.open(path, mode)
+
+    def write(self, job: RenderJob, documents: BinaryIO, size: int) -> None:
+        if not size:
+            return
+        info = tarfile.TarInfo(
+            f"{job.instance.name}/{job.cluster.name}/{job.appname}.yaml"
+        )
+        info.size = size
+        info.mtime = int(time.time())
+        info.mode = 0o644
+        self._tar.addfile(info, documents)
+
+    def close(self) -> None:
+        self._tar.close()
+
+
+class DirectorySink(OutputSink):
+    """
+    The DirectorySink writes the rendered documents of each application into a separate file
+    "<path>/<instance>/<cluster>/<app>.yaml". Files are replaced atomically (written to a temporary
+    file and renamed), so readers never see partially written documents. Files whose content would
+    not change are not touched at all, so their modification time only changes with their content.
+
+    The file of an application that rendered no documents is removed, so the directory never contains
+    documents of a previous run as if they were current. The file of an application whose render
+    failed is left as it is (and not pruned), it keeps the documents of the last successful render. With prune, the files of all applications
+    that were not written at all (e.g. because they have been removed from the configuration) are
+    removed when the sink is closed.
+
+    Attributes
+    ----------
+    path : str
+        the output directory
+    prune : bool
+        whether to remove the files of applications not written until the sink is closed
+    written : int
+        the number of files written
+    unchanged : int
+        the number of files skipped because their content did not change
+    removed : int
+        the number of files removed
+    """
+
+    def __init__(self, path: str, prune: bool = False) -> None:
+        """
+        Parameters
+        ----------
+        path : str
+            the output directory; it is created if it does not exist
+        prune : bool, optional
+            whether to remove the files of applications not written until the sink is closed; only
+            useful if all applications are rendered; the default is False
+        """
+        self.path = path
+        self.prune = prune
+        self.written = 0
+        self.unchanged = 0
+        self.removed = 0
+        self._targets = set()
+        os.makedirs(self.path, exist_ok=True)
+
+    def write(self, job: RenderJob, documents: BinaryIO, size: int) -> None:
+        target = self._target(job)
+        if not size:
+            self._remove(target)
+            return
+        self._targets.add(target)
+        with contextlib.suppress(OSError):
+            if os.path.getsize(target) == size:
+                digest = file_digest(documents).digest()
+                documents.seek(0)
+                if file_digest(target).digest() == digest:
+                    self.unchanged += 1
+                    return
+
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                shutil.copyfileobj(documents, f)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, target)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+            raise
+        self.written += 1
+
+    def skip(self, job: RenderJob) -> None:
+        self._targets.add(self._target(job))
+
+    def close(self) -> None:
+        if not self.prune:
+            return
+        for dirpath, _, filenames in os.walk(self.path, topdown=False):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                if filename.endswith(".yaml") and path not in self._targets:
+                    self._remove(path)
+            if dirpath != self.path:
+                # only succeeds for directories left empty
+                with contextlib.suppress(OSError):
+                    os.rmdir(dirpath)
+
+    def _target(self, job: RenderJob) -> str:
+        return os.path.join(
+            self.path, job.instance.name, job.cluster.name, f"{job.appname}.yaml"
+        )
+
+    def _remove(self, path: str) -> None:
+        """
+        Removes the given output file, if it exists.
+
+        Parameters
+        ----------
+        path : str
+            the path of the file to remove
+        """
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+            self.removed += 1
+
+
+def prepare_dependencies(
+    helm: Helm, render_jobs: list, pool: WorkerPool = None
+) -> None:
+    """
+    Prepares the dependencies of all charts used by the given jobs whose charts/ directory lacks
+    declared dependencies (see Helm.missing_dependencies()), so the helm template calls do not have
+    to fail first. Every chart is handled once, no matter how many jobs use it, and all charts are
+    prepared in one batch in parallel. Failed builds are ignored here, the template calls still
+    detect missing dependencies, retry and report the errors.
+
+    Parameters
+    ----------
+    helm : Helm
+        the Helm object used to prepare the dependencies
+    render_jobs : list
+        the jobs whose charts should be prepared
+    pool : WorkerPool, optional
+        the pool executing the dependency builds; the default is to build them one after another
+    """
+    charts = {}
+    for job in render_jobs:
+        if job.app.exists:
+            charts.setdefault(job.app.path, None)
+    charts = [chart for chart in charts if helm.missing_dependencies(chart)]
+    if not charts:
+        return
+
+    if pool is None:
+        pool = WorkerPool()
+    with contextlib.closing(
+        pool.map_ordered(helm.prepare_dependencies, charts)
+    ) as results:
+        for _ in results:
+            pass
+
+
+def affected_jobs(render_jobs: list, changed_files: list) -> list:
+    """
+    Returns the jobs affected by the given changed files, in the order of the provided jobs.
+
+    Parameters
+    ----------
+    render_jobs : list
+        the jobs to check
+    changed_files : list
+        the paths of the changed (added, modified or deleted) files
+    """
+    index = DependencyIndex(candidates=True)
+    for job in render_jobs:
+        index.add(job)
+
+    affected = set()
+    for path in changed_files:
+        affected.update(id(job) for job in index.consumers(path))
+
+    result = [job for job in render_jobs if id(job) in affected]
+    print(
+        f"{len(result)} of {len(render_jobs)} applications affected by {len(changed_files)} changed files",
+        file=sys.stderr,
+    )
+    return result
+
+
+def write_report(path: str, results: list, dependency_times: dict = {}) -> None:
+    """
+    Writes a JSON report with one record per rendered application, in render order. Each record
+    holds:
+    * instance, cluster, application, chart: what has been rendered
+    * returncode: the exit code of the render (99 if the application does not exist)
+    * seconds: the wall time of the helm call (or of the cache lookup)
+    * value_files: the number of value files passed to helm
+    * output_bytes: the size of the rendered documents
+    * cache: "hit" or "miss" if a render cache is used, null otherwise
+    * dependency_seconds: the time spent preparing the dependencies of the chart (shared by all
+      applications using the chart)
+
+    Parameters
+    ----------
+    path : str
+        the path of the report file
+    results : list
+        list of (RenderJob, dict) tuples; the dict holds the measured values of the job
+    dependency_times : dict, optional
+        the time in seconds spent preparing the dependencies of each chart (chart path -> seconds)
+    """
+    records = []
+    for job, measured in results:
+        records.append(
+            {
+                "instance": job.instance.name,
+                "cluster": job.cluster.name,
+                "application": job.appname,
+                "chart": job.app.path,
+                "returncode": measured["returncode"],
+                "seconds": round(measured["seconds"], 6),
+                "value_files": len(job.value_paths) if job.app.exists else 0,
+                "output_bytes": measured["output_bytes"],
+                "cache": measured["cache"],
+                "dependency_seconds": round(dependency_times.get(job.app.path, 0.0), 6),
+            }
+        )
+    with open(path, "w") as f:
+        json.dump(records, f, indent=2)
+        f.write("\n")
+
+
 def render(
-    instance: Instance,
+    instances: Union[Instance, list],
     cluster_regex: str = ".*",
     app_regex: str = ".*",
     fatal_errors: bool = False,
     helm_bin: str = "helm",
     git_bin: str = "git",
-    git_clean: bool = True,
+    cleanup: bool = True,
     debug: bool = False,
     show_only: list = [],
     full_results: bool = True,
     quiet: bool = False,
     warn_notfound: bool = False,
+    jobs: int = 1,
+    cache: RenderCache = None,
+    changed_since: str = None,
+    sink: OutputSink = None,
+    dependency_cache: DependencyCache = None,
+    report: str = None,
+    helm_timeout: float = None,
 ) -> int:
     """
     render() implements the "render" cli command. It uses the data in the
@@ -1192,8 +3666,10 @@ def render(
 
     Parametes
     ---------
-    instance : Instance
-        the Instance object for which the applications should be rendered
+    instances : Instance|list
+        the Instance object (or list of Instance objects) for which the applications should be
+        rendered; multiple instances share the helm calls, the worker pool and the cache and are
+        rendered in the given order
     cluster_regex : str, optional
         the regex used to select which clusters to operate on; the default '.*'
     app_regex : str, optional
@@ -1208,8 +3684,9 @@ def render(
         the helm binary to use; the default is 'helm'
     git_bin : str, optional
         the git binary to use; the default is 'git'
-    git_clean : bool, optional
-        whether to perform the git clean step before and after templating; the default is True
+    cleanup : bool, optional
+        whether to remove the files created by preparing the chart dependencies (chart archives, lock
+        files) when finished, files that existed before are kept; the default is True
     debug : bool, optional
         whether to pass the --debug parameter to helm; the default is False
     show_only : list, optional
@@ -1231,105 +3708,941 @@ def render(
         return a zero exit code even when an application is missing; nevertheless it will still
         list the application as failed in the execution results;
         the default is False, so missing applications result in a non-zero exitcode
+    jobs : int, optional
+        the number of helm calls executed in parallel; independent of the number of jobs, the rendered
+        documents and execution results are printed in cluster/application order and with fatal_errors,
+        all pending helm calls are cancelled on the first error; the default is 1
+    cache : RenderCache, optional
+        the cache used for the results of the helm calls; if provided, unchanged applications are
+        not rendered again but their stored result is used; the default is not to use a cache
+    changed_since : str, optional
+        a git ref; if provided, only the selected applications affected by files that changed since
+        the ref forked off the current HEAD (including uncommitted changes) are rendered; the default
+        is to render all selected applications
+    sink : OutputSink, optional
+        the sink receiving the rendered documents; the output of helm is streamed to the sink, so it
+        is never held in memory as a whole; the sink is not closed by render(); the default writes
+        the documents to stdout
+    dependency_cache : DependencyCache, optional
+        the cache used for the chart dependencies; the default is to build the dependencies of each
+        chart once per run
+    report : str, optional
+        path of a JSON report with one record per rendered application (see write_report()); the
+        default is not to write a report
+    helm_timeout : float, optional
+        the maximum time in seconds a helm call may run before it is killed and reported as failed;
+        the default is no limit
     """
-    clusters = instance.select_clusters(cluster_regex)
-    helm = Helm(helm_bin, debug)
+    if isinstance(instances, Instance):
+        instances = [instances]
+    if sink is None:
+        sink = StdoutSink()
+    runner = ProcessRunner()
+    artifacts = ChartArtifacts() if cleanup else None
+    helm = Helm(
+        helm_bin, debug, cache, dependency_cache, artifacts, runner, helm_timeout
+    )
+
+    render_jobs = []
+    with PROFILER.phase("render.select_jobs"):
+        for instance in instances:
+            render_jobs.extend(select_jobs(instance, cluster_regex, app_regex))
+
+    if changed_since is not None and instances:
+        changed_files = GitCLI(git_bin, debug, runner).changed_files(
+            changed_since, instances[0].layout.root
+        )
+        if changed_files is None:
+            runner.close()
+            return 1
+        render_jobs = affected_jobs(render_jobs, changed_files)
+
+    records = {}
+
+    def _template(job: RenderJob) -> Union[tuple, None]:
+        stats = {}
+        start = time.perf_counter()
+        with PROFILER.phase("render.template"):
+            result = job.template(helm, show_only, stream=True, stats=stats)
+        records[id(job)] = {
+            "seconds": time.perf_counter() - start,
+            "cache": stats.get("cache"),
+        }
+        return result
 
-    if git_clean:
-        git = GitCLI(git_bin, debug)
-        git.clean_ignored()
-        atexit.register(git.clean_ignored)
+    def _key(job: RenderJob) -> str:
+        # cluster names are only unique within an instance
+        if len(instances) > 1:
+            return f"{job.instance.name} {job.key}"
+        return job.key
 
+    pool = WorkerPool(jobs)
     exit_codes = {}
-    for clustername, cluster in clusters.items():
-        applications = cluster.select_applications(app_regex)
-        for appname, app in applications.items():
+    try:
+        with PROFILER.phase("render.dependencies"):
+            prepare_dependencies(helm, render_jobs, pool)
+        with contextlib.closing(pool.map_ordered(_template, render_jobs)) as results:
+            for job, result in results:
+                print(
+                    f"################ {_key(job)} ################",
+                    file=sys.stderr,
+                )
+                if result is None:
+                    print(
+                        f"Application '{job.appname}' not found in path '{job.app.path}'!",
+                        file=sys.stderr,
+                    )
+                    # we can use the fatal-errors flag here to decide if we
+                    # should continue (without calling helm, making this situation
+                    # a warning) or if we should treat it as an error and bail out.
+                    records[id(job)].update(returncode=99, output_bytes=0)
+                    if fatal_errors:
+                        return 99
+                    exit_codes[_key(job)] = 99
+                    continue
+
+                stdout, stderr, returncode = result
+                with stdout:
+                    size = stdout.seek(0, os.SEEK_END)
+                    stdout.seek(0)
+                    # the output of a failed (or timed out) render is incomplete, the sink keeps
+                    # the documents of the last successful one
+                    if not quiet:
+                        with PROFILER.phase("render.output"):
+                            if returncode == 0:
+                                sink.write(job, stdout, size)
+                            else:
+                                sink.skip(job)
+                records[id(job)].update(returncode=returncode, output_bytes=size)
+                if stderr:
+                    print(stderr, file=sys.stderr)
+
+                if fatal_errors and (returncode != 0):
+                    return returncode
+                exit_codes[_key(job)] = returncode
+    finally:
+        # kill the helm calls still running after a fatal error before waiting for the workers
+        runner.close()
+        pool.close()
+        if artifacts is not None:
+            artifacts.cleanup()
+        if report is not None:
+            write_report(
+                report,
+                [
+                    (job, records[id(job)])
+                    for job in render_jobs
+                    if "returncode" in records.get(id(job), {})
+                ],
+                helm.dependency_times,
+            )
+        if debug:
+            hits = misses = 0
+            for instance in instances:
+                hits += instance.cluster_group_apps.values_file_paths_hits
+                misses += instance.cluster_group_apps.values_file_paths_misses
             print(
-                f"################ {clustername} {appname} ################",
+                f"Group value file chains: {hits} hits, {misses} misses",
                 file=sys.stderr,
             )
-            if not app.exists:
+        if cache is not None:
+            if debug:
+                print(
+                    f"Render cache: {cache.hits} hits, {cache.misses} misses",
+                    file=sys.stderr,
+                )
+            cache.evict()
+        if dependency_cache is not None:
+            if debug:
+                print(
+                    f"Dependency cache: {dependency_cache.hits} hits, {dependency_cache.misses} misses",
+                    file=sys.stderr,
+                )
+            dependency_cache.evict()
+
+    exit_code = 0
+    executions = list(exit_codes.keys())
+
+    # no chart was rendered (because the cluster/app regex did not match anything)
+    # the execution was successfull, so we can return the default exit code
+    if len(executions) == 0:
+        return exit_code
+
+    # exactly one chart has been rendered, so we return the exit code of this
+    # helm call
+    if len(executions) == 1:
+        return exit_codes[executions[0]]
+
+    # more than one chart has been rendered, so we return an overview of
+    # all exit codes
+    print("Execution results:", file=sys.stderr)
+    for exec in executions:
+        code = exit_codes[exec]
+
+        if (code != 0) or full_results:
+            print(f"  {exec}: {code}", file=sys.stderr)
+        if code != 0:
+            # 99 is a "virtual" exit code, assigned when an application exists in the config
+            # but not in the filesystem
+            if code == 99 and warn_notfound:
+                continue
+            exit_code = 1
+    if exit_code == 0:
+        print("  All applications rendered successfully!", file=sys.stderr)
+    return exit_code
+
+
+def unified_diff(
+    a: list, b: list, fromfile: str, tofile: str, ignore_whitespace: bool = False
+) -> list:
+    """
+    Returns the lines of a unified diff (with 3 lines of context) between two lists of lines, like
+    difflib.unified_diff does.
+
+    Parameters
+    ----------
+    a : list
+        the lines to diff from, including line endings
+    b : list
+        the lines to diff to, including line endings
+    fromfile : str
+        the name of the file to diff from, used in the header
+    tofile : str
+        the name of the file to diff to, used in the header
+    ignore_whitespace : bool, optional
+        whether to ignore all whitespace when comparing lines, like "diff -w" does; lines differing
+        only in whitespace are shown as they are in a; the default is False
+    """
+    if not ignore_whitespace:
+        return list(difflib.unified_diff(a, b, fromfile, tofile))
+
+    def _range(start: int, stop: int) -> str:
+        # same format as diff -u: the start is 1-based, except for an empty range
+        length = stop - start
+        if length == 1:
+            return f"{start + 1}"
+        if length == 0:
+            return f"{start},0"
+        return f"{start + 1},{length}"
+
+    def _normalize(line: str) -> str:
+        return "".join(line.split())
+
+    matcher = difflib.SequenceMatcher(
+        None, [_normalize(line) for line in a], [_normalize(line) for line in b]
+    )
+    lines = []
+    for group in matcher.get_grouped_opcodes(3):
+        if not lines:
+            lines += [f"--- {fromfile}\n", f"+++ {tofile}\n"]
+        first, last = group[0], group[-1]
+        lines.append(
+            f"@@ -{_range(first[1], last[2])} +{_range(first[3], last[4])} @@\n"
+        )
+        for tag, i1, i2, j1, j2 in group:
+            if tag == "equal":
+                lines += [" " + line for line in a[i1:i2]]
+                continue
+            if tag in ("replace", "delete"):
+                lines += ["-" + line for line in a[i1:i2]]
+            if tag in ("replace", "insert"):
+                lines += ["+" + line for line in b[j1:j2]]
+    return lines
+
+
+def diff(
+    instance: Instance,
+    src_ref: str,
+    dst_ref: str,
+    cluster_regex: str = ".*",
+    app_regex: str = ".*",
+    helm_bin: str = "helm",
+    git_bin: str = "git",
+    debug: bool = False,
+    show_only: list = [],
+    jobs: int = 1,
+    cache: RenderCache = None,
+    dependency_cache: DependencyCache = None,
+    helm_timeout: float = None,
+    ignore_whitespace: bool = False,
+) -> int:
+    """
+    diff() implements the "diff" cli command. It renders the selected applications of the instance at
+    two git refs and prints a unified diff of the rendered documents for each application that differs.
+
+    Both refs are checked out into temporary git worktrees, so the current working tree is never
+    touched. Applications whose inputs (chart contents, value files, helm parameters) are identical at
+    both refs are not rendered at all, all others are rendered in parallel for both refs.
+
+    Returns 0 if there are no differences, 1 if there are differences and 2 if an error occurred.
+
+    Parameters
+    ----------
+    instance : Instance
+        the Instance object whose name and directory layout are used for both refs
+    src_ref : str
+        the git ref to compare from
+    dst_ref : str
+        the git ref to compare to
+    cluster_regex : str, optional
+        the regex used to select which clusters to operate on; the default '.*'
+    app_regex : str, optional
+        the regex used to select which applications on each cluster to operate on;
+        the default is '.*'
+    helm_bin : str, optional
+        the helm binary to use; the default is 'helm'
+    git_bin : str, optional
+        the git binary to use; the default is 'git'
+    debug : bool, optional
+        whether to pass the --debug parameter to helm; the default is False
+    show_only : list, optional
+        list of filenames relative to the "template" directory of an application that
+        should be rendered; the default is an empty list, meaning all templates are rendered
+    jobs : int, optional
+        the number of helm calls executed in parallel; the default is 1
+    cache : RenderCache, optional
+        the cache used for the results of the helm calls; the default is not to use a cache
+    dependency_cache : DependencyCache, optional
+        the cache used for the chart dependencies; the default is not to use a cache
+    helm_timeout : float, optional
+        the maximum time in seconds a helm call may run before it is killed and reported as failed;
+        the default is no limit
+    ignore_whitespace : bool, optional
+        whether to ignore all whitespace when comparing the rendered documents, like "diff -w" does;
+        the default is False
+    """
+    runner = ProcessRunner()
+    git = GitCLI(git_bin, debug, runner)
+    toplevel = git.toplevel(instance.layout.root)
+    if toplevel is None:
+        runner.close()
+        return 2
+    # the layout root might be a subdirectory of the repository
+    root = os.path.relpath(os.path.abspath(instance.layout.root), toplevel)
+
+    helm = Helm(
+        helm_bin, debug, cache, dependency_cache, runner=runner, timeout=helm_timeout
+    )
+    pool = WorkerPool(jobs)
+    tmpdir = tempfile.mkdtemp(prefix="render-diff-")
+    worktrees = []
+    try:
+        sides = []
+        for side, ref in (("src", src_ref), ("dst", dst_ref)):
+            worktree = os.path.join(tmpdir, side)
+            if not git.worktree_add(worktree, ref, toplevel):
+                return 2
+            worktrees.append(worktree)
+
+            layout = instance.layout.with_root(
+                os.path.normpath(os.path.join(worktree, root))
+            )
+            try:
+                ref_instance = Instance(
+                    instance.name, layout, yaml_backend=instance.yaml_backend
+                )
+            except FileNotFoundError:
                 print(
-                    f"Application '{appname}' not found in path '{app.path}'!",
+                    f"Instance '{instance.name}' does not exist at '{ref}'",
                     file=sys.stderr,
                 )
-                # trying to render a non existing app would cause a helm error
-                # so we can use the fatal-errors flag here to decide if we
-                # should continue (without calling helm, making this situation
-                # a warning) or if we should treat it as an error and bail out.
-                if fatal_errors:
-                    return 99
-                exit_codes[f"{clustername} {appname}"] = 99
+                sides.append({})
                 continue
+            ref_jobs = select_jobs(ref_instance, cluster_regex, app_regex)
+            sides.append({job.key: job for job in ref_jobs})
+        src_jobs, dst_jobs = sides
+
+        # only render the applications whose inputs differ between the refs
+        chart_digests = {}
+        items = []
+        keys = list(src_jobs) + [key for key in dst_jobs if key not in src_jobs]
+        for key in keys:
+            src_job = src_jobs.get(key)
+            dst_job = dst_jobs.get(key)
+            if src_job and dst_job:
+                src_digest = src_job.inputs_digest(show_only, chart_digests)
+                dst_digest = dst_job.inputs_digest(show_only, chart_digests)
+                if src_digest == dst_digest:
+                    if debug:
+                        print(f"Skipping unchanged '{key}'", file=sys.stderr)
+                    continue
+            items.append((key, src_job))
+            items.append((key, dst_job))
+        prepare_dependencies(helm, [job for _, job in items if job is not None], pool)
+
+        def _template(item: tuple) -> Union[tuple, None]:
+            _, job = item
+            if job is None:
+                return None
+            return job.template(helm, show_only)
+
+        exit_code = 0
+        documents = []
+        with contextlib.closing(pool.map_ordered(_template, items)) as results:
+            for (key, job), result in results:
+                if job is not None and result is None:
+                    print(
+                        f"Application '{job.appname}' not found in path '{job.app.path}'!",
+                        file=sys.stderr,
+                    )
+                if result is not None:
+                    stdout, stderr, returncode = result
+                    if returncode != 0:
+                        print(f"Failed to render '{key}':", file=sys.stderr)
+                        print(stderr, file=sys.stderr)
+                        exit_code = 2
+                    documents.append(stdout)
+                else:
+                    documents.append("")
 
-            value_paths = []
-            value_paths.append(app.values_path)
-            value_paths.append(app.secrets_path)
-            value_paths.append(app.addon_values_path)
-            value_paths.append(app.addon_secrets_path)
-            value_paths.extend(cluster.app_group_values_file_paths(appname))
-            value_paths.extend(cluster.app_cluster_values_file_paths(appname))
-            value_paths = list(filter(None, value_paths))
-
-            # pass argocd metadata as explicit values to helm
-            #
-            # the template rendering the ArgoCD application resource
-            # adds the same values as parameters to each app when
-            # rendering the resource
-            values = {
-                "argocdParams.clusterName": clustername,
-                "argocdParams.clusterAPI": cluster.api,
-                "argocdParams.argocdStage": instance.name,
-            }
+                # the results of both refs have been collected
+                if len(documents) < 2:
+                    continue
+                src_document, dst_document = documents
+                documents = []
+                lines = unified_diff(
+                    src_document.splitlines(keepends=True),
+                    dst_document.splitlines(keepends=True),
+                    f"{src_ref} {key}",
+                    f"{dst_ref} {key}",
+                    ignore_whitespace,
+                )
+                if not lines:
+                    continue
 
-            stdout, stderr, returncode = helm.template(
-                f"{app.name}-{clustername}",
-                app.namespace,
-                app.path,
-                value_paths,
-                values,
-                show_only,
-            )
+                print(f"################ {key} ################", file=sys.stderr)
+                for line in lines:
+                    sys.stdout.write(line)
+                    if not line.endswith("\n"):
+                        sys.stdout.write("\n\\ No newline at end of file\n")
+                exit_code = max(exit_code, 1)
+        return exit_code
+    finally:
+        pool.close()
+        for worktree in worktrees:
+            git.worktree_remove(worktree, toplevel)
+        runner.close()
+        shutil.rmtree(tmpdir, ignore_errors=True)
+        if cache is not None:
+            cache.evict()
+        if dependency_cache is not None:
+            dependency_cache.evict()
+
+
+def who_uses(instances: list, files: list, candidates: bool = True) -> int:
+    """
+    who_uses() implements the "who-uses" cli command. For each given file, it prints the
+    applications (instance, cluster and application name) whose render consumes the file,
+    e.g. as value file, as part of the chart or as instance configuration.
 
-            if stdout and not quiet:
-                print(stdout)
-            if stderr:
-                print(stderr, file=sys.stderr)
+    Parameters
+    ----------
+    instances : list
+        the Instance objects to search
+    files : list
+        the paths of the files to look up
+    candidates : bool, optional
+        whether value files that do not exist, but would be used if they did, are considered
+        as well; the default is True
+
+    Returns
+    -------
+    int
+        0 if at least one of the files is consumed by an application, 1 otherwise
+    """
+    index = DependencyIndex(candidates)
+    for instance in instances:
+        for job in select_jobs(instance):
+            index.add(job)
+
+    found = False
+    for file in files:
+        consumers = index.consumers(file)
+        indent = ""
+        if len(files) > 1:
+            print(f"{file}:")
+            indent = "  "
+        for job in consumers:
+            print(f"{indent}{job.instance.name} {job.key}")
+        found = found or bool(consumers)
 
-            if fatal_errors and (returncode != 0):
-                return returncode
-            exit_codes[f"{clustername} {appname}"] = returncode
+    return 0 if found else 1
 
-    exit_code = 0
-    executions = list(exit_codes.keys())
 
-    # no chart was rendered (because the cluster/app regex did not match anything)
-    # the execution was successfull, so we can return the default exit code
-    if len(executions) == 0:
-        return exit_code
+class InotifyWatcher:
+    """
+    The InotifyWatcher class watches directory trees for changes with the inotify API of the Linux
+    kernel (through ctypes) and reports them to a callback from a background thread.
 
-    # exactly one chart has been rendered, so we return the exit code of this
-    # helm call
-    if len(executions) == 1:
-        return exit_codes[executions[0]]
+    The callback is called with the path, the kind of change ("created", "deleted" or "modified")
+    and whether the path is a directory. If events have been lost (queue overflow), it is called
+    with None as path, meaning anything might have changed.
 
-    # more than one chart has been rendered, so we return an overview of
-    # all exit codes
-    print("Execution results:", file=sys.stderr)
-    for exec in executions:
-        code = exit_codes[exec]
+    Attributes
+    ----------
+    roots : list
+        the watched directories
+    """
 
-        if (code != 0) or full_results:
-            print(f"  {exec}: {code}", file=sys.stderr)
-        if code != 0:
-            # 99 is a "virtual" exit code, assigned when an application exists in the config
-            # but not in the filesystem
-            if code == 99 and warn_notfound:
+    IN_MODIFY = 0x00000002
+    IN_ATTRIB = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ISDIR = 0x40000000
+    MASK = (
+        IN_MODIFY
+        | IN_ATTRIB
+        | IN_CLOSE_WRITE
+        | IN_MOVED_FROM
+        | IN_MOVED_TO
+        | IN_CREATE
+        | IN_DELETE
+    )
+    EVENT = struct.Struct("iIII")
+
+    def __init__(self, roots: list, callback) -> None:
+        """
+        Raises OSError if inotify is not available or the directories cannot be watched (e.g.
+        because the watch limit is exceeded).
+
+        Parameters
+        ----------
+        roots : list
+            the directories to watch, including all subdirectories
+        callback : callable
+            called with (path, change, isdir) for each change
+        """
+        self.roots = roots
+        self._callback = callback
+        self._watches = {}
+        libc_name = ctypes.util.find_library("c")
+        if libc_name is None:
+            raise OSError("libc not found")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self._libc, "inotify_init1"):
+            raise OSError("inotify is not supported")
+        self._fd = self._libc.inotify_init1(os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        try:
+            for root in roots:
+                self._watch_tree(root)
+        except OSError:
+            os.close(self._fd)
+            raise
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> None:
+        """
+        Starts reporting changes.
+        """
+        self._thread.start()
+
+    def _watch_tree(self, root: str) -> None:
+        visited = set()
+        for dirpath, dirnames, _ in os.walk(root, followlinks=True):
+            # symlinked directories can form cycles
+            realpath = os.path.realpath(dirpath)
+            if realpath in visited:
+                dirnames[:] = []
                 continue
-            exit_code = 1
-    if exit_code == 0:
-        print("  All applications rendered successfully!", file=sys.stderr)
-    return exit_code
+            visited.add(realpath)
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(dirpath), self.MASK)
+            if wd < 0:
+                raise OSError(ctypes.get_errno(), f"cannot watch {dirpath}")
+            self._watches[wd] = os.path.normpath(dirpath)
+
+    def _run(self) -> None:
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except OSError:
+                return
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = self.EVENT.unpack_from(data, offset)
+                offset += self.EVENT.size
+                name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+                offset += length
+                self._dispatch(wd, mask, name)
+
+    def _dispatch(self, wd: int, mask: int, name: str) -> None:
+        if mask & self.IN_Q_OVERFLOW:
+            self._callback(None, "modified", False)
+            return
+        if mask & self.IN_IGNORED:
+            self._watches.pop(wd, None)
+            return
+        directory = self._watches.get(wd)
+        if directory is None or not name:
+            return
+
+        path = os.path.join(directory, name)
+        isdir = bool(mask & self.IN_ISDIR)
+        if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+            if isdir:
+                # files created before the watch was added do not generate events,
+                # the directory change makes the callback rescan anyway
+                with contextlib.suppress(OSError):
+                    self._watch_tree(path)
+            self._callback(path, "created", isdir)
+        elif mask & (self.IN_DELETE | self.IN_MOVED_FROM):
+            self._callback(path, "deleted", isdir)
+        else:
+            self._callback(path, "modified", isdir)
+
+
+class PollingWatcher:
+    """
+    The PollingWatcher class watches directory trees for changes by periodically comparing the
+    modification times and sizes of all files. It is the fallback where inotify is not available and
+    reports changes like the InotifyWatcher.
+
+    Attributes
+    ----------
+    roots : list
+        the watched directories
+    interval : float
+        the time in seconds between two scans
+    """
+
+    def __init__(self, roots: list, callback, interval: float = 1.0) -> None:
+        """
+        Parameters
+        ----------
+        roots : list
+            the directories to watch, including all subdirectories
+        callback : callable
+            called with (path, change, isdir) for each change
+        interval : float, optional
+            the time in seconds between two scans; the default is 1 second
+        """
+        self.roots = roots
+        self.interval = interval
+        self._callback = callback
+        self._state = self._scan()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> None:
+        """
+        Starts reporting changes.
+        """
+        self._thread.start()
+
+    def _scan(self) -> dict:
+        state = {}
+        for root in self.roots:
+            for dirpath, _, filenames in walk_tree(root):
+                state[dirpath] = None
+                for filename in filenames:
+                    path = os.path.join(dirpath, filename)
+                    with contextlib.suppress(OSError):
+                        stat = os.stat(path)
+                        state[path] = (stat.st_mtime_ns, stat.st_size)
+        return state
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            state = self._scan()
+            for path, signature in state.items():
+                if path not in self._state:
+                    self._callback(path, "created", signature is None)
+                elif signature != self._state[path]:
+                    self._callback(path, "modified", False)
+            for path, signature in self._state.items():
+                if path not in state:
+                    self._callback(path, "deleted", signature is None)
+            self._state = state
+
+
+class SocketChannel(io.RawIOBase):
+    """
+    A SocketChannel is a writable stream sending everything written to it as frames of one channel
+    over a socket. Each frame consists of the channel number (1 byte), the payload length (4 bytes,
+    big endian) and the payload. Channel 0 carries the exit code, 1 stdout and 2 stderr.
+    """
+
+    HEADER = struct.Struct(">BI")
+
+    def __init__(self, conn: socket.socket, channel: int) -> None:
+        """
+        Parameters
+        ----------
+        conn : socket.socket
+            the connected socket
+        channel : int
+            the channel number of the frames
+        """
+        super().__init__()
+        self._conn = conn
+        self._channel = channel
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        if data:
+            self._conn.sendall(self.HEADER.pack(self._channel, len(data)) + data)
+        return len(data)
+
+
+class RenderServer:
+    """
+    The RenderServer class keeps instances (configuration, groups, clusters, applications, resolved
+    value files) and the filesystem index in memory and executes cli commands sent by clients over a
+    Unix socket (see render_client()). Changes below the instance, project and shared chart
+    directories are watched and invalidate only the affected state:
+    * a changed configuration file drops its instance, which is reloaded on the next request
+    * a created or deleted file updates the filesystem index, a created or deleted value file also
+      drops the memoized group value files
+    * the chart archives and lock files created and removed while rendering are ignored
+    * modified value files or chart files need no invalidation, they are read by helm on each render
+
+    Requests are executed one at a time, their stdout and stderr are streamed back to the client.
+
+    Attributes
+    ----------
+    path : str
+        the path of the Unix socket
+    layout : DirectoryLayout
+        the directory layout of all instances
+    """
+
+    def __init__(
+        self,
+        path: str,
+        layout: DirectoryLayout,
+        handler,
+        snapshot_dir: str = None,
+        yaml_backend: str = "auto",
+    ) -> None:
+        """
+        Parameters
+        ----------
+        path : str
+            the path of the Unix socket
+        layout : DirectoryLayout
+            the directory layout of all instances
+        handler : callable
+            called with the server and the cli arguments of a request, returns the exit code
+        snapshot_dir : str, optional
+            directory for configuration snapshots of the instances (see Instance)
+        yaml_backend : str, optional
+            the yaml backend used to parse the configuration files
+        """
+        self.path = path
+        self.layout = layout
+        self.snapshot_dir = snapshot_dir
+        self.yaml_backend = yaml_backend
+        self._handler = handler
+        self._instances = {}
+        self._lock = threading.Lock()
+
+    def instance(self, name: str) -> Instance:
+        """
+        Returns the in-memory instance with the given name, loading it if necessary.
+
+        Parameters
+        ----------
+        name : str
+            the name of the instance
+        """
+        try:
+            return self._instances[name]
+        except KeyError:
+            self._instances[name] = Instance(
+                name, self.layout, self.snapshot_dir, self.yaml_backend
+            )
+            return self._instances[name]
+
+    def invalidate(self, path: Union[str, None], change: str, isdir: bool) -> None:
+        """
+        Invalidates the in-memory state affected by a change of the given path (see the class
+        documentation). A path of None invalidates everything.
+
+        Parameters
+        ----------
+        path : str|None
+            the changed path
+        change : str
+            the kind of change: "created", "deleted" or "modified"
+        isdir : bool
+            whether the path is a directory
+        """
+        with self._lock:
+            if path is None:
+                self._instances = {}
+                if self.layout.index is not None:
+                    self.layout.index.invalidate()
+                return
+
+            if self._is_dependency_artifact(path):
+                return
+
+            for name, instance in list(self._instances.items()):
+                if instance.is_config_file(path) or (
+                    isdir and instance.is_config_file(os.path.join(path, "x.yaml"))
+                ):
+                    del self._instances[name]
+
+            if change == "modified":
+                return
+            if self.layout.index is not None:
+                self.layout.index.update(path, change == "created", isdir)
+            # only value files (and directories that might contain them) change the value file chains
+            if not isdir and not path.endswith(".yaml"):
+                return
+            for instance in self._instances.values():
+                cluster_group_apps = getattr(instance, "_cluster_group_apps", None)
+                if cluster_group_apps is not None:
+                    cluster_group_apps.clear_values_file_paths()
+
+    def _is_dependency_artifact(self, path: str) -> bool:
+        """
+        Returns True if the given path is created or removed while preparing chart dependencies (see
+        ChartArtifacts), i.e. a lock file or a path in the charts/ or tmpcharts/ directory of a chart.
+        Renders change these all the time, but they never affect the in-memory state.
+
+        Parameters
+        ----------
+        path : str
+            the changed path
+        """
+        if os.path.basename(path) in DependencyCache.LOCK_FILES:
+            return True
+        parent = os.path.dirname(path)
+        while path != parent:
+            if os.path.basename(path) in (
+                ("charts",) + ChartArtifacts.TEMPORARY_DIRS
+            ) and os.path.isfile(os.path.join(parent, "Chart.yaml")):
+                return True
+            path, parent = parent, os.path.dirname(parent)
+        return False
+
+    def serve(self, poll: bool = False) -> int:
+        """
+        Watches the filesystem and serves requests until interrupted.
+
+        Parameters
+        ----------
+        poll : bool, optional
+            whether to poll the filesystem for changes instead of using inotify; polling is used
+            anyway if inotify is not available; the default is False
+        """
+        roots = [
+            p
+            for p in (self.layout.instances, self.layout.projects, self.layout.shared)
+            if os.path.isdir(p)
+        ]
+        watcher = None
+        if not poll:
+            try:
+                watcher = InotifyWatcher(roots, self.invalidate)
+            except OSError as e:
+                print(f"inotify not available ({e}), polling", file=sys.stderr)
+        if watcher is None:
+            watcher = PollingWatcher(roots, self.invalidate)
+        watcher.start()
+
+        def _terminate(signum, frame) -> None:
+            raise KeyboardInterrupt()
+
+        # shut down cleanly when stopped by a service manager
+        signal.signal(signal.SIGTERM, _terminate)
+
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self.path)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            server.bind(self.path)
+            server.listen()
+            print(f"Listening on {self.path}", file=sys.stderr)
+            while True:
+                conn, _ = server.accept()
+                with conn:
+                    self._handle(conn)
+        except KeyboardInterrupt:
+            return 0
+        finally:
+            server.close()
+            with contextlib.suppress(OSError):
+                os.remove(self.path)
+
+    def _handle(self, conn: socket.socket) -> None:
+        with conn.makefile("rb") as f:
+            try:
+                argv = json.loads(f.readline())["argv"]
+            except (ValueError, KeyError, TypeError):
+                return
+
+        stdout = io.TextIOWrapper(
+            io.BufferedWriter(SocketChannel(conn, 1)), encoding="UTF-8"
+        )
+        stderr = io.TextIOWrapper(
+            io.BufferedWriter(SocketChannel(conn, 2)), encoding="UTF-8"
+        )
+        code = 1
+        try:
+            with self._lock, contextlib.redirect_stdout(
+                stdout
+            ), contextlib.redirect_stderr(stderr):
+                try:
+                    code = self._handler(self, argv)
+                except SystemExit as e:
+                    # argparse exits on invalid arguments
+                    code = e.code if isinstance(e.code, int) else 1
+                except Exception:
+                    traceback.print_exc()
+                finally:
+                    sys.stdout.flush()
+                    sys.stderr.flush()
+            conn.sendall(SocketChannel.HEADER.pack(0, 4) + struct.pack(">i", code))
+        except OSError:
+            # the client went away
+            pass
+
+
+def render_client(path: str, argv: list) -> int:
+    """
+    Sends the given cli arguments to a RenderServer listening on the given Unix socket, writes the
+    output of the request to stdout/stderr and returns its exit code.
+
+    Parameters
+    ----------
+    path : str
+        the path of the Unix socket
+    argv : list
+        the cli arguments, as they would be passed to render.py
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        try:
+            conn.connect(path)
+        except OSError as e:
+            print(f"error: cannot connect to '{path}': {e}", file=sys.stderr)
+            return 1
+        conn.sendall(json.dumps({"argv": argv}).encode("UTF-8") + b"\n")
+
+        with conn.makefile("rb") as f:
+            while True:
+                header = f.read(SocketChannel.HEADER.size)
+                if len(header) < SocketChannel.HEADER.size:
+                    print("error: connection to the server lost", file=sys.stderr)
+                    return 1
+                channel, length = SocketChannel.HEADER.unpack(header)
+                payload = f.read(length)
+                if channel == 0:
+                    return struct.unpack(">i", payload)[0]
+                out = sys.stdout if channel == 1 else sys.stderr
+                out.buffer.write(payload)
+                out.buffer.flush()
 
 
 def list_clusters(instance: Instance, cluster_regex: str = ".*") -> int:
@@ -1390,14 +4703,7 @@ def list_cluster_apps(
             result = f"{indent}{appname}"
             if paths:
                 result = f"{result} ({app.path})"
-                value_paths = []
-                value_paths.append(app.values_path)
-                value_paths.append(app.secrets_path)
-                value_paths.append(app.addon_values_path)
-                value_paths.append(app.addon_secrets_path)
-                value_paths.extend(cluster.app_group_values_file_paths(appname))
-                value_paths.extend(cluster.app_cluster_values_file_paths(appname))
-                value_paths = list(filter(None, value_paths))
+                value_paths = cluster.app_values_file_paths(appname)
 
                 result = "%s\n    %s" % (result, "\n    ".join(value_paths))
             print(result)
@@ -1435,30 +4741,169 @@ def list_cluster_groups(instance: Instance, cluster_regex: str = ".*") -> int:
 
 if __name__ == "__main__":
 
-    def cmd_render(args: argparse.Namespace, instance: Instance) -> int:
-        return render(
-            instance,
+    def render_cache(args: argparse.Namespace) -> Union[RenderCache, None]:
+        if args.no_cache:
+            return None
+        return RenderCache(
+            os.path.join(args.cache_dir, "render"),
+            args.cache_max_age * 24 * 3600,
+            args.cache_max_size * 1024 * 1024,
+        )
+
+    def dependency_cache(args: argparse.Namespace) -> Union[DependencyCache, None]:
+        if args.no_cache:
+            return None
+        return DependencyCache(
+            os.path.join(args.cache_dir, "dependencies"),
+            args.cache_max_age * 24 * 3600,
+        )
+
+    def report_path(value: str) -> str:
+        # --report takes <format>=<path>, to allow for other formats later on
+        format, _, path = value.partition("=")
+        if format != "json" or not path:
+            raise argparse.ArgumentTypeError(f"expected json=<path>, got '{value}'")
+        return path
+
+    def add_cache_arguments(subparser: argparse.ArgumentParser) -> None:
+        subparser.add_argument(
+            "--no-cache",
+            default=False,
+            action="store_true",
+            help="always call helm instead of using cached render results and chart dependencies",
+        )
+        subparser.add_argument(
+            "--cache-max-age",
+            metavar="DAYS",
+            type=float,
+            default=7,
+            help="evict cached render results and chart dependencies not used for the given number of days (default: 7)",
+        )
+        subparser.add_argument(
+            "--cache-max-size",
+            metavar="MB",
+            type=int,
+            default=1024,
+            help="evict the least recently used render results above the given cache size (default: 1024)",
+        )
+
+    def add_execution_arguments(subparser: argparse.ArgumentParser) -> None:
+        subparser.add_argument(
+            "--helm-timeout",
+            metavar="SECONDS",
+            type=float,
+            help="kill helm calls running longer than the given number of seconds and report them "
+            f"as failed with exit code {ProcessRunner.TIMEOUT} (default: no limit)",
+        )
+
+    def instance_names(args: argparse.Namespace) -> list:
+        if args.all_instances:
+            return layout.instance_names()
+        return args.instance or ["int"]
+
+    def cmd_render(args: argparse.Namespace, instances: list) -> int:
+        cache = render_cache(args)
+        sink = StdoutSink()
+        if args.output_tar:
+            sink = TarballSink(args.output_tar)
+        elif args.output_dir:
+            if args.prune_output and args.changed_since:
+                print(
+                    "error: --prune-output cannot be used with --changed-since",
+                    file=sys.stderr,
+                )
+                return 1
+            sink = DirectorySink(args.output_dir, args.prune_output)
+        with contextlib.closing(sink):
+            return render(
+                instances,
+                args.clusters,
+                args.applications,
+                args.fatal_errors,
+                args.helm,
+                args.git,
+                not args.no_cleanup,
+                args.debug,
+                args.show_only,
+                args.full_execution_results,
+                args.quiet,
+                args.warn_notfound,
+                args.jobs,
+                cache,
+                args.changed_since,
+                sink,
+                dependency_cache(args),
+                args.report,
+                args.helm_timeout,
+            )
+
+    def cmd_diff(args: argparse.Namespace, instances: list) -> int:
+        return diff(
+            instances[0],
+            args.src_ref,
+            args.dst_ref,
             args.clusters,
             args.applications,
-            args.fatal_errors,
             args.helm,
             args.git,
-            not args.no_git_clean,
             args.debug,
             args.show_only,
-            args.full_execution_results,
-            args.quiet,
-            args.warn_notfound,
+            args.jobs,
+            render_cache(args),
+            dependency_cache(args),
+            args.helm_timeout,
+            args.ignore_all_space,
+        )
+
+    def cmd_who_uses(args: argparse.Namespace, instances: list) -> int:
+        return who_uses(instances, args.files, not args.existing_only)
+
+    def cmd_serve(args: argparse.Namespace, instances: list) -> int:
+        def _handle(server: RenderServer, argv: list) -> int:
+            request = parser.parse_args(argv)
+            if not request.cmd or request.cmd == "serve":
+                print(f"error: unsupported command: {request.cmd}", file=sys.stderr)
+                return 1
+            # the layout and the configuration options of the server apply to all requests
+            try:
+                request_instances = [
+                    server.instance(name) for name in instance_names(request)
+                ]
+            except Exception as e:
+                print(f"error: {e}", file=sys.stderr)
+                return 1
+            if len(request_instances) != 1 and not getattr(
+                request, "multi_instance", False
+            ):
+                print(
+                    f"error: the {request.cmd} command requires exactly one instance",
+                    file=sys.stderr,
+                )
+                return 1
+            try:
+                return request.func(request, request_instances)
+            except (GroupCycle, NamingConflict) as e:
+                print(f"error: {e}", file=sys.stderr)
+                return 1
+
+        server = RenderServer(
+            args.socket, layout, _handle, snapshot_dir, args.yaml_backend
         )
+        # load the instances given on the command line up front, others are loaded on first use
+        for instance in instances:
+            server.instance(instance.name).clusters
+        return server.serve(args.poll)
 
-    def cmd_list_clusters(args: argparse.Namespace, instance: Instance) -> int:
-        return list_clusters(instance, args.clusters)
+    def cmd_list_clusters(args: argparse.Namespace, instances: list) -> int:
+        return list_clusters(instances[0], args.clusters)
 
-    def cmd_list_cluster_apps(args: argparse.Namespace, instance: Instance) -> int:
-        return list_cluster_apps(instance, args.clusters, args.applications, args.paths)
+    def cmd_list_cluster_apps(args: argparse.Namespace, instances: list) -> int:
+        return list_cluster_apps(
+            instances[0], args.clusters, args.applications, args.paths
+        )
 
-    def cmd_list_cluster_groups(args: argparse.Namespace, instance: Instance) -> int:
-        return list_cluster_groups(instance, args.clusters)
+    def cmd_list_cluster_groups(args: argparse.Namespace, instances: list) -> int:
+        return list_cluster_groups(instances[0], args.clusters)
 
     parser = argparse.ArgumentParser(
         # using 'description=__doc__' here kills all formatting of the header comment, making
@@ -1501,10 +4946,66 @@ if __name__ == "__main__":
         default="shared/charts",
         help="directory for shared charts",
     )
+    parser.add_argument(
+        "--no-fs-index",
+        default=False,
+        action="store_true",
+        help="check the existence of value files on the filesystem instead of an index built at startup",
+    )
     parser.add_argument(
         "--instance",
-        default="int",
-        help="name of the argocd instance",
+        action="append",
+        help="name of the argocd instance; can be used multiple times with the render and who-uses commands (default: int)",
+    )
+    parser.add_argument(
+        "--all-instances",
+        default=False,
+        action="store_true",
+        help="use all instances, i.e. all directories in the instance root directory containing a Chart.yaml",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=default_cache_dir(),
+        help="directory for persistent caches (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--yaml-backend",
+        default="auto",
+        choices=["auto", "libyaml", "python"],
+        help="yaml implementation used to parse the configuration; auto uses libyaml if available (default: auto)",
+    )
+    parser.add_argument(
+        "--server",
+        default=False,
+        action="store_true",
+        help="execute the command in a running render server (see the serve command); relative paths "
+        "are resolved against the working directory of the server",
+    )
+    parser.add_argument(
+        "--socket",
+        help="path of the Unix socket of the render server (default: render.sock in the cache directory)",
+    )
+    parser.add_argument(
+        "--profile",
+        default=False,
+        action="store_true",
+        help="print the time spent in each phase and event counters to stderr when finished",
+    )
+    parser.add_argument(
+        "--profile-pstats",
+        metavar="path",
+        help="profile the main thread with cProfile and write the statistics (pstats format) to path; implies --profile",
+    )
+    parser.add_argument(
+        "--profile-trace",
+        metavar="path",
+        help="write the recorded phases as Chrome trace events (JSON) to path; implies --profile",
+    )
+    parser.add_argument(
+        "--no-config-snapshot",
+        default=False,
+        action="store_true",
+        help="always parse the instance configuration files instead of using a snapshot",
     )
 
     subparsers = parser.add_subparsers(dest="cmd")
@@ -1532,10 +5033,13 @@ if __name__ == "__main__":
         "--git", metavar="file", default="git", help="git binary to use"
     )
     render_parser.add_argument(
+        "--no-cleanup",
         "--no-git-clean",
+        dest="no_cleanup",
         default=False,
         action="store_true",
-        help="do not perform git cleanup before and after templating",
+        help="keep the chart dependencies (charts/*.tgz, lock files) created while templating instead "
+        "of removing them when finished",
     )
     render_parser.add_argument(
         "-x",
@@ -1575,7 +5079,137 @@ if __name__ == "__main__":
         action="store_true",
         help="do not print the rendered yaml documents",
     )
-    render_parser.set_defaults(func=cmd_render)
+    render_parser.add_argument(
+        "-j",
+        "--jobs",
+        metavar="N",
+        type=int,
+        default=1,
+        help="number of helm calls to execute in parallel (default: 1)",
+    )
+    add_cache_arguments(render_parser)
+    add_execution_arguments(render_parser)
+    render_parser.add_argument(
+        "--report",
+        metavar="json=path",
+        type=report_path,
+        help="write a JSON report with exit code, timings, value file count, output size and cache "
+        "usage of each application",
+    )
+    output_group = render_parser.add_mutually_exclusive_group()
+    output_group.add_argument(
+        "--output-dir",
+        metavar="dir",
+        help="write the rendered documents of each application to <dir>/<instance>/<cluster>/<app>.yaml "
+        "instead of stdout; files whose content does not change are not rewritten",
+    )
+    render_parser.add_argument(
+        "--prune-output",
+        default=False,
+        action="store_true",
+        help="with --output-dir, remove the files of all applications not rendered in this run "
+        "(e.g. removed applications or clusters); files of applications outside the selected "
+        "clusters/applications are removed as well",
+    )
+    output_group.add_argument(
+        "--output-tar",
+        metavar="path",
+        help="write the rendered documents into a tar archive (one <instance>/<cluster>/<app>.yaml "
+        "member per application) instead of stdout; compressed according to the extension "
+        "(.tar.gz, .tgz, .tar.bz2, .tar.xz)",
+    )
+    render_parser.add_argument(
+        "--changed-since",
+        metavar="ref",
+        help="only render applications affected by files changed since the given git ref",
+    )
+    render_parser.set_defaults(func=cmd_render, multi_instance=True)
+
+    diff_parser = subparsers.add_parser(
+        "diff", help="diff the rendered applications between two git refs"
+    )
+    diff_parser.add_argument("src_ref", metavar="src-ref", help="git ref to diff from")
+    diff_parser.add_argument("dst_ref", metavar="dst-ref", help="git ref to diff to")
+    diff_parser.add_argument(
+        "clusters",
+        metavar="clusters",
+        nargs="?",
+        default=".*",
+        help="the clusters for which to render the applications; ^$ wrapped regex",
+    )
+    diff_parser.add_argument(
+        "applications",
+        metavar="apps",
+        nargs="?",
+        default=".*",
+        help="applications to render; ^$ wrapped regex",
+    )
+    diff_parser.add_argument(
+        "--helm", metavar="file", default="helm", help="helm binary to use"
+    )
+    diff_parser.add_argument(
+        "--git", metavar="file", default="git", help="git binary to use"
+    )
+    diff_parser.add_argument(
+        "-s",
+        "--show-only",
+        metavar="file.yaml",
+        action="append",
+        help="yaml file name of the template to be rendered (can be used multiple times)",
+    )
+    diff_parser.add_argument(
+        "--debug",
+        default=False,
+        action="store_true",
+        help="print helm command and call helm with --debug",
+    )
+    diff_parser.add_argument(
+        "-j",
+        "--jobs",
+        metavar="N",
+        type=int,
+        default=1,
+        help="number of helm calls to execute in parallel (default: 1)",
+    )
+    diff_parser.add_argument(
+        "-w",
+        "--ignore-all-space",
+        default=False,
+        action="store_true",
+        help="ignore all whitespace when comparing the rendered applications",
+    )
+    add_cache_arguments(diff_parser)
+    add_execution_arguments(diff_parser)
+    diff_parser.set_defaults(func=cmd_diff)
+
+    who_uses_parser = subparsers.add_parser(
+        "who-uses", help="list the applications consuming the given files"
+    )
+    who_uses_parser.add_argument(
+        "files",
+        metavar="file",
+        nargs="+",
+        help="value file, chart file or instance configuration file",
+    )
+    who_uses_parser.add_argument(
+        "--existing-only",
+        default=False,
+        action="store_true",
+        help="ignore value files that do not exist but would be used if they did",
+    )
+    who_uses_parser.set_defaults(func=cmd_who_uses, multi_instance=True)
+
+    serve_parser = subparsers.add_parser(
+        "serve",
+        help="keep the instances in memory and execute commands sent with --server",
+    )
+    serve_parser.add_argument(
+        "--poll",
+        default=False,
+        action="store_true",
+        help="poll the filesystem for changes instead of using inotify",
+    )
+    serve_parser.set_defaults(func=cmd_serve, multi_instance=True)
 
     list_clusters_parser = subparsers.add_parser("list_clusters", help="list clusters")
     list_clusters_parser.add_argument(
@@ -1622,6 +5256,19 @@ if __name__ == "__main__":
     list_cluster_groups_parser.set_defaults(func=cmd_list_cluster_groups)
 
     args = parser.parse_args()
+    if args.socket is None:
+        args.socket = os.path.join(args.cache_dir, "render.sock")
+    if args.server:
+        # forward the command line without the options addressing the server
+        argv = []
+        arguments = iter(sys.argv[1:])
+        for argument in arguments:
+            if argument == "--socket":
+                next(arguments, None)
+            elif argument != "--server" and not argument.startswith("--socket="):
+                argv.append(argument)
+        sys.exit(render_client(args.socket, argv))
+
     layout = DirectoryLayout(
         args.root,
         args.instance_dir,
@@ -1631,9 +5278,24 @@ if __name__ == "__main__":
         args.cluster_values_dir,
         args.group_values_dir,
         args.shared_charts_dir,
+        not args.no_fs_index,
     )
     try:
-        instance = Instance(args.instance, layout)
+        snapshot_dir = None
+        if not args.no_config_snapshot:
+            snapshot_dir = os.path.join(args.cache_dir, "config")
+        # fail early if the requested yaml backend is not available
+        yaml_backend(args.yaml_backend)
+        instances = [
+            Instance(
+                name,
+                layout,
+                snapshot_dir,
+                args.yaml_backend,
+                getattr(args, "debug", False),
+            )
+            for name in instance_names(args)
+        ]
     except Exception as e:
         print(f"error: {e}", file=sys.stderr)
         sys.exit(1)
@@ -1642,4 +5304,35 @@ if __name__ == "__main__":
         parser.print_help()
         sys.exit(1)
 
-    sys.exit(args.func(args, instance))
+    if len(instances) != 1 and not getattr(args, "multi_instance", False):
+        print(
+            f"error: the {args.cmd} command requires exactly one instance",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+    if args.profile or args.profile_pstats or args.profile_trace:
+        PROFILER.enabled = True
+        profile = None
+        if args.profile_pstats:
+            profile = cProfile.Profile()
+
+        def _profile_report() -> None:
+            if profile is not None:
+                profile.disable()
+                profile.dump_stats(args.profile_pstats)
+            if args.profile_trace:
+                PROFILER.write_trace(args.profile_trace)
+            PROFILER.print_summary()
+
+        atexit.register(_profile_report)
+        if profile is not None:
+            profile.enable()
+
+    # the configuration of the instances is loaded lazily, so errors in it show up while running the command
+    try:
+        code = args.func(args, instances)
+    except (GroupCycle, NamingConflict) as e:
+        print(f"error: {e}", file=sys.stderr)
+        code = 1
+    sys.exit(code)
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+
+# Documentation style according to https://realpython.com/documenting-python-code/, NumPy/SciPy docstrings format
+
+"""Tests for the Multi Cluster / Multi Application Render Tool
+
+The tests run against a copy of the instances, projects and shared charts of this repository in a
+temporary directory, with a stub helm binary instead of helm.
+
+Examples:
+    python -m unittest discover -s hacks
+    python -m pytest hacks
+"""
+
+import contextlib
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import render  # noqa: E402
+from benchmark import STUB_HELM  # noqa: E402
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class FileIndexTest(unittest.TestCase):
+    def test_symlinks(self) -> None:
+        root = tempfile.mkdtemp(prefix="render-test-")
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        os.makedirs(os.path.join(root, "shared", "sub"))
+        with open(os.path.join(root, "shared", "values.yaml"), "w"):
+            pass
+        # two aliases of the same directory and a cycle
+        os.symlink(os.path.join(root, "shared"), os.path.join(root, "a"))
+        os.symlink(os.path.join(root, "shared"), os.path.join(root, "b"))
+        os.symlink(
+            os.path.join(root, "shared"), os.path.join(root, "shared", "sub", "loop")
+        )
+
+        index = render.FileIndex([root])
+        for alias in ("shared", "a", "b"):
+            path = os.path.join(root, alias, "values.yaml")
+            self.assertTrue(os.path.isfile(path))
+            self.assertTrue(index.isfile(path), path)
+            self.assertTrue(index.isdir(os.path.join(root, alias, "sub")))
+        # the cycle is not followed
+        self.assertFalse(
+            index.isfile(
+                os.path.join(root, "a", "sub", "loop", "sub", "loop", "values.yaml")
+            )
+        )
+
+
+class MissingDependenciesTest(unittest.TestCase):
+    def test_archive_names(self) -> None:
+        chart = tempfile.mkdtemp(prefix="render-test-")
+        self.addCleanup(shutil.rmtree, chart, ignore_errors=True)
+        with open(os.path.join(chart, "Chart.yaml"), "w") as f:
+            f.write(
+                "apiVersion: v2\n"
+                "name: test\n"
+                "version: 0.1.0\n"
+                "dependencies:\n"
+                "  - {name: foo, version: 1.0.0}\n"
+                "  - {name: bar, version: ~1}\n"
+                "  - {name: baz, version: 2.0.0}\n"
+            )
+        os.makedirs(os.path.join(chart, "charts"))
+        for archive in ("foo-bar-1.0.0.tgz", "bar-1.2.0.tgz", "baz-1.0.0.tgz"):
+            with open(os.path.join(chart, "charts", archive), "w"):
+                pass
+
+        helm = render.Helm()
+        self.assertEqual(["foo", "baz"], helm.missing_dependencies(chart))
+        with open(os.path.join(chart, "charts", "foo-1.0.0.tgz"), "w"):
+            pass
+        self.assertEqual(["baz"], helm.missing_dependencies(chart))
+
+
+class RepositoryTestCase(unittest.TestCase):
+    """
+    Base class for tests working on a git repository with a copy of the instances, projects and shared
+    charts of this repository.
+    """
+
+    def setUp(self) -> None:
+        self.root = tempfile.mkdtemp(prefix="render-test-")
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        for dirname in ("instances", "projects", "shared"):
+            shutil.copytree(
+                os.path.join(REPOSITORY, dirname), os.path.join(self.root, dirname)
+            )
+        self.helm = os.path.join(self.root, "bin", "helm")
+        os.makedirs(os.path.dirname(self.helm))
+        with open(self.helm, "w") as f:
+            f.write(STUB_HELM)
+        os.chmod(self.helm, 0o755)
+        self.git("init", "-q")
+        self.commit()
+
+    def git(self, *params: str) -> str:
+        return subprocess.run(
+            ["git", "-c", "user.name=test", "-c", "user.email=test@example.com"]
+            + list(params),
+            cwd=self.root,
+            check=True,
+            stdout=subprocess.PIPE,
+        ).stdout.decode("UTF-8")
+
+    def commit(self) -> None:
+        self.git("add", "-A")
+        self.git("commit", "-q", "--allow-empty", "-m", "test")
+
+    def instance(self, name: str = "int") -> render.Instance:
+        return render.Instance(name, render.DirectoryLayout(self.root))
+
+
+class DiffTest(RepositoryTestCase):
+    def test_local_dependency_change(self) -> None:
+        # cluster-inventory depends on the namespace-skeleton chart with a file:// repository
+        template = os.path.join(
+            self.root,
+            "shared",
+            "charts",
+            "namespace-skeleton",
+            "templates",
+            "test.yaml",
+        )
+        with open(template, "w") as f:
+            f.write("# changed\n")
+        self.commit()
+
+        with open(os.devnull, "w") as devnull:
+            with contextlib.redirect_stdout(devnull):
+                code = render.diff(
+                    self.instance(),
+                    "HEAD~1",
+                    "HEAD",
+                    app_regex="cluster-inventory",
+                    helm_bin=self.helm,
+                )
+        self.assertEqual(code, 1)
+
+    def test_ignore_whitespace(self) -> None:
+        template = os.path.join(
+            self.root,
+            "projects",
+            "default",
+            "applications",
+            "cluster-inventory",
+            "test.txt",
+        )
+        with open(template, "w") as f:
+            f.write("a:\n  b: 1\n")
+        self.commit()
+        with open(template, "w") as f:
+            f.write("a:\n  b:   1 \n")
+        self.commit()
+
+        for ignore_whitespace, expected in ((False, 1), (True, 0)):
+            with open(os.devnull, "w") as devnull:
+                with contextlib.redirect_stdout(devnull):
+                    code = render.diff(
+                        self.instance(),
+                        "HEAD~1",
+                        "HEAD",
+                        app_regex="cluster-inventory",
+                        helm_bin=self.helm,
+                        ignore_whitespace=ignore_whitespace,
+                    )
+            self.assertEqual(code, expected)
+
+
+class ChangedSinceTest(RepositoryTestCase):
+    def test_symlinked_root(self) -> None:
+        # git reports the real path of the repository, the layout uses the symlink
+        link = os.path.join(tempfile.mkdtemp(prefix="render-test-link-"), "root")
+        self.addCleanup(shutil.rmtree, os.path.dirname(link), ignore_errors=True)
+        os.symlink(self.root, link)
+        instance = render.Instance("int", render.DirectoryLayout(link))
+
+        values = os.path.join(
+            link,
+            "projects",
+            "default",
+            "values",
+            "groups",
+            "stage",
+            "test",
+            "common.yaml",
+        )
+        with open(values, "a") as f:
+            f.write("# changed\n")
+
+        changed_files = render.GitCLI().changed_files("HEAD", link)
+        self.assertEqual(
+            [os.path.realpath(values)], [os.path.realpath(p) for p in changed_files]
+        )
+        jobs = render.select_jobs(instance)
+        with open(os.devnull, "w") as devnull:
+            with contextlib.redirect_stderr(devnull):
+                affected = render.affected_jobs(jobs, changed_files)
+        self.assertEqual(len(affected), len(jobs))
+
+
+class RenderServerTest(RepositoryTestCase):
+    def test_render_keeps_index(self) -> None:
+        instance = self.instance()
+        layout = instance.layout
+
+        def _handle(server: render.RenderServer, argv: list) -> int:
+            return render.render(
+                server.instance(argv[0]), helm_bin=self.helm, quiet=True
+            )
+
+        server = render.RenderServer(
+            os.path.join(self.root, "render.sock"), layout, _handle
+        )
+        server._instances[instance.name] = instance
+        sentinel = os.path.join(layout.projects, "sentinel")
+        seen = threading.Event()
+
+        def _invalidate(path, change: str, isdir: bool) -> None:
+            server.invalidate(path, change, isdir)
+            if path == sentinel:
+                seen.set()
+
+        try:
+            watcher = render.InotifyWatcher(
+                [layout.projects, layout.shared], _invalidate
+            )
+        except OSError as e:
+            self.skipTest(f"inotify not available: {e}")
+        watcher.start()
+
+        app = "cluster-inventory"
+        self.assertTrue(instance.clusters["cluster-b"].app_values_file_paths(app))
+        self.assertTrue(layout.isdir(layout.projects))
+        index = layout.index._files
+        memo = instance.cluster_group_apps._values_file_paths
+
+        # execute a request like a client does, the render builds and removes chart dependencies
+        server_conn, client_conn = socket.socketpair()
+        with server_conn, client_conn:
+            client_conn.sendall(json.dumps({"argv": ["int"]}).encode("UTF-8") + b"\n")
+            server._handle(server_conn)
+        self.assertFalse(
+            os.path.exists(os.path.join(layout.app("default", app), "Chart.lock"))
+        )
+
+        # events are reported in order, once the sentinel is seen all render events have been handled
+        with open(sentinel, "w"):
+            pass
+        self.assertTrue(seen.wait(10))
+        self.assertIs(layout.index._files, index)
+        self.assertIn(sentinel, layout.index._files)
+        self.assertIs(instance.cluster_group_apps._values_file_paths, memo)
+        self.assertIs(server.instance("int"), instance)
+
+
+if __name__ == "__main__":
+    unittest.main()